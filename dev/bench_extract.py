@@ -0,0 +1,58 @@
+# benchmark the year accumulation in Survey.extract against the old pypeds_init concat loop
+# python dev/bench_extract.py          synthetic HD and C_A sized years
+# python dev/bench_extract.py --live   real 20 year HD and C_A pulls, both ways
+import sys
+import time
+import numpy as np
+import pandas as pd
+from pypeds import ipeds
+
+
+def old_concat(frames):
+    # the loop every survey class used before the Survey base class
+    init_df = pd.DataFrame({'pypeds_init': [True]})
+    for tmp_df in frames:
+        init_df = pd.concat([init_df, tmp_df], ignore_index=True, sort=False)
+    init_df = init_df.loc[init_df.pypeds_init != True, ]
+    init_df = init_df.drop(columns=['pypeds_init'])
+    return (pd.concat([pd.DataFrame(), init_df], ignore_index=True))
+
+
+def fake_year(rows, cols, year, seed):
+    # a survey year shaped like the typed output of read_survey
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'unitid': np.arange(100000, 100000 + rows, dtype='int32')})
+    for i in range(cols):
+        if i % 3 == 0:
+            df['code{}'.format(i)] = pd.array(rng.integers(-3, 9, rows), dtype='Int8')
+        else:
+            df['amt{}'.format(i)] = rng.random(rows).astype('float32')
+    df['xflag'] = pd.Categorical(rng.choice(['R', 'P', 'Z'], rows))
+    df['survey_year'] = year
+    df['fall_year'] = year
+    return (df)
+
+
+def bench(label, frames):
+    started = time.perf_counter()
+    old = old_concat(frames)
+    old_secs = time.perf_counter() - started
+    started = time.perf_counter()
+    new = ipeds._accumulate(frames)
+    new_secs = time.perf_counter() - started
+    print('{:<30} old {:8.3f}s {:8.1f} MB   new {:8.3f}s {:8.1f} MB'.format(
+        label,
+        old_secs, old.memory_usage(deep=True).sum() / 1e6,
+        new_secs, new.memory_usage(deep=True).sum() / 1e6))
+
+
+if __name__ == '__main__':
+    years = list(range(2002, 2022))
+    if '--live' in sys.argv:
+        for cls in [ipeds.HD, ipeds.C_A]:
+            survey = cls(years=years)
+            frames = list(survey.extract_iter())
+            bench(cls.__name__ + ' 2002-2021', frames)
+    else:
+        bench('HD-like, 20 x 7k x 60', [fake_year(7000, 60, y, y) for y in years])
+        bench('C_A-like, 20 x 300k x 10', [fake_year(300000, 10, y, y) for y in years])
@@ -0,0 +1,60 @@
+# benchmark the label transforms of C_A: pd.merge with the lookup tables against ipeds.decode
+# python dev/bench_labels.py          a synthetic C_A year, about 330,000 rows and 60 count columns
+# python dev/bench_labels.py --live   a real C_A year and the published lookup tables
+import sys
+import time
+import numpy as np
+import pandas as pd
+from pypeds import ipeds
+from pypeds import datasets
+
+
+def fake_year(rows=330000, cols=60, seed=0):
+    # shaped like the typed C_A output of read_survey, with lookup tables of the same size as the real ones
+    rng = np.random.default_rng(seed)
+    cips = pd.DataFrame({'cipcode': np.round(rng.choice(np.arange(1, 60, 0.0001), 1500, replace=False), 4)})
+    cips['ciptitle'] = ['title {}'.format(i) for i in range(len(cips))]
+    levels = pd.DataFrame({'awlevel': range(1, 20), 'awlevel_label': ['level {}'.format(i) for i in range(1, 20)]})
+    df = pd.DataFrame({'unitid': rng.integers(100000, 500000, rows).astype('int32'),
+                       'cipcode': rng.choice(np.append(cips.cipcode.to_numpy(), [99.0]), rows),
+                       'majornum': pd.array(rng.integers(1, 3, rows), dtype='Int8'),
+                       'awlevel': pd.array(rng.integers(1, 20, rows), dtype='Int8')})
+    for i in range(cols):
+        df['ctotal{}'.format(i)] = rng.random(rows).astype('float32')
+    return (df, cips, levels)
+
+
+def with_merge(df, cips, levels):
+    df = pd.merge(left=df, right=cips, on='cipcode', how='left')
+    return (pd.merge(left=df, right=levels, on='awlevel', how='left'))
+
+
+def with_decode(df, cips, levels):
+    df = ipeds.decode(df, cips, 'cipcode')
+    return (ipeds.decode(df, levels, 'awlevel'))
+
+
+def best(func, df, cips, levels, repeat=5):
+    times = []
+    for _ in range(repeat):
+        copy = df.copy()
+        started = time.perf_counter()
+        func(copy, cips, levels)
+        times.append(time.perf_counter() - started)
+    return (min(times))
+
+
+def main():
+    if '--live' in sys.argv:
+        c = ipeds.C_A(years=[2018])
+        c.extract()
+        df, cips, levels = c.load(), datasets.cipcodes(), datasets.award_levels()
+    else:
+        df, cips, levels = fake_year()
+    merged = best(with_merge, df, cips, levels)
+    decoded = best(with_decode, df, cips, levels)
+    print('rows {:,}  merge {:.4f}s  decode {:.4f}s  {:.1f}x'.format(len(df), merged, decoded, merged / decoded))
+
+
+if __name__ == '__main__':
+    main()
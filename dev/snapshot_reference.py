@@ -0,0 +1,18 @@
+# download the lookup tables into pypeds/data, so they ship with the next build
+# python dev/snapshot_reference.py
+import os
+import shutil
+from pypeds import reference
+
+
+def main():
+    folder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pypeds', 'data')
+    os.makedirs(folder, exist_ok=True)
+    for name in reference.URLS:
+        path = reference.download(name)
+        shutil.copyfile(path, os.path.join(folder, name + '.csv'))
+        print(name, os.path.basename(path))
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,7 @@ __version__ = '0.151'
 from pypeds.ipeds import *
 from pypeds.datasets import *
 from pypeds.views import *
+from pypeds.registry import Session
 
 
 
@@ -0,0 +1,478 @@
+# persistent, content addressed cache for the survey zip files published by NCES
+import os
+import json
+import time
+import collections
+import contextlib
+import hashlib
+import tempfile
+import threading
+import zipfile
+import concurrent.futures
+import requests
+from urllib.parse import urlparse
+from pypeds import config
+
+
+# bytes read from the network, and from disk, at a time
+CHUNK_SIZE = 1024 * 1024
+
+
+class DownloadError(requests.RequestException):
+    """
+    Raised when a survey zip could not be downloaded intact after every retry.
+    """
+
+
+# ================================= paths and metadata
+
+def cache_dir():
+    """
+    Return the folder that holds the cached survey zips, creating it if needed.
+    """
+
+    path = os.path.join(config.get_option('cache_dir'), 'zips')
+    os.makedirs(path, exist_ok=True)
+    return (path)
+
+
+def _meta_path(survey):
+    # one small json file per survey file, next to the folder of its zips
+    return (os.path.join(cache_dir(), survey.lower() + '.json'))
+
+
+def _read_meta(survey):
+    try:
+        with open(_meta_path(survey)) as f:
+            return (json.load(f))
+    except (OSError, ValueError):
+        return (None)
+
+
+def _write_meta(survey, meta):
+    # write to a temporary file first so a crash never leaves half a json file behind
+    fd, tmp = tempfile.mkstemp(dir=cache_dir(), suffix='.json.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp, _meta_path(survey))
+
+
+def _cached_file(meta):
+    # the zip the metadata points at, if it is still on disk
+    if meta is None:
+        return (None)
+    path = os.path.join(cache_dir(), meta['file'])
+    if not os.path.exists(path):
+        return (None)
+    return (path)
+
+
+def _part_path(survey):
+    # the download in progress, kept between attempts so it can be resumed
+    folder = os.path.join(cache_dir(), survey.lower())
+    os.makedirs(folder, exist_ok=True)
+    return (os.path.join(folder, survey.lower() + '.zip.part'))
+
+
+def _promote(survey, part):
+    # keep the zip under its content hash so a revised upstream file never overwrites the old one mid-read
+    sha = hashlib.sha256()
+    with open(part, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+    file = os.path.join(survey.lower(), digest + '.zip')
+    os.replace(part, os.path.join(cache_dir(), file))
+    return (digest, file)
+
+
+# ================================= politeness and background downloads
+
+_lock = threading.Lock()
+_hosts = {}
+_inflight = {}
+_pins = collections.Counter()
+_pool = None
+_session = None
+_surveys = {}
+
+
+def session():
+    """
+    Return the pooled requests session used for every survey download.
+    """
+
+    global _session
+    with _lock:
+        if _session is None:
+            size = max(config.get_option('max_workers'), config.get_option('host_connections'))
+            adapter = requests.adapters.HTTPAdapter(pool_connections=size, pool_maxsize=size)
+            _session = requests.Session()
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return (_session)
+
+
+def _survey_lock(survey):
+    # one download of a given survey file at a time
+    with _lock:
+        if survey not in _surveys:
+            _surveys[survey] = threading.Lock()
+        return (_surveys[survey])
+
+
+class _Polite(object):
+    # bounds the open connections to one host and spaces out the requests made to it
+
+    def __init__(self, host):
+        self.host = host
+        self.slots = threading.BoundedSemaphore(config.get_option('host_connections'))
+        self.last = 0
+        self.clock = threading.Lock()
+
+    def __enter__(self):
+        self.slots.acquire()
+        with self.clock:
+            wait = self.last + config.get_option('host_delay') - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            self.last = time.time()
+
+    def __exit__(self, *args):
+        self.slots.release()
+
+
+def _polite(url):
+    host = urlparse(url).netloc
+    with _lock:
+        if host not in _hosts:
+            _hosts[host] = _Polite(host)
+        return (_hosts[host])
+
+
+def _executor(workers=None):
+    # one shared pool, rebuilt only when the worker limit changes
+    global _pool
+    if workers is None:
+        workers = config.get_option('max_workers')
+    with _lock:
+        if _pool is None or _pool._max_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers,
+                                                          thread_name_prefix='pypeds')
+        return (_pool)
+
+
+def prefetch(year_infos, workers=None):
+    """
+    Start downloading one or more survey zips in the background and return right away.
+
+    A later fetch for the same survey waits on the background download instead of starting its own,
+    so the survey classes can parse one year while the remaining years are still downloading.
+
+    Parameters:
+        year_infos (list): dictionaries with url and survey keys, as returned by ipeds.get_hd and friends
+        workers (int): the number of download threads, defaults to config.options['max_workers']
+    """
+
+    pool = _executor(workers)
+    _pending()
+    for info in year_infos:
+        with _lock:
+            if info['survey'] not in _inflight:
+                future = pool.submit(_fetch, info['url'], info['survey'])
+                future.add_done_callback(_finished)
+                _inflight[info['survey']] = future
+
+
+def _finished(future):
+    # when the background download ended, so a zip nobody came to read is not trusted forever
+    future.finished = time.time()
+
+
+def _pending():
+    # the surveys downloading or downloaded in the background and not read yet.  A failed download, or one
+    # left unread for longer than cache_revalidate, is dropped so the next fetch checks with nces again
+    now = time.time()
+    with _lock:
+        for survey, future in list(_inflight.items()):
+            if not future.done():
+                continue
+            stale = now - getattr(future, 'finished', now) > config.get_option('cache_revalidate')
+            if future.cancelled() or future.exception() is not None or stale:
+                del _inflight[survey]
+        return (set(_inflight))
+
+
+@contextlib.contextmanager
+def using(surveys):
+    """
+    Keep the cached zips of these surveys while the with block reads them, then trim the cache to its limits.
+
+    Parameters:
+        surveys (list): the survey file ids, for example HD2017
+    """
+
+    with _lock:
+        _pins.update(surveys)
+    try:
+        yield
+    finally:
+        with _lock:
+            _pins.subtract(surveys)
+            for survey in surveys:
+                if _pins[survey] <= 0:
+                    del _pins[survey]
+        evict()
+
+
+# ================================= fetch
+
+def fetch(url=None, survey=None):
+    """
+    Return the local path to the zip file for a survey, downloading it only when needed.
+
+    A cached zip is used as is for config.options['cache_revalidate'] seconds.  After that, NCES is asked
+    with a conditional request (ETag / Last-Modified) and the file is only downloaded again when it changed
+    upstream.  If NCES cannot be reached, the cached zip is used.
+
+    Parameters:
+        url (str): the url of the survey zip file
+        survey (str): the survey file id, for example HD2017
+    """
+
+    # pick up a background download started by prefetch, unless it was left unread for too long
+    _pending()
+    with _lock:
+        future = _inflight.get(survey)
+    if future is not None:
+        try:
+            return (future.result())
+        finally:
+            with _lock:
+                if _inflight.get(survey) is future:
+                    del _inflight[survey]
+    return (_fetch(url, survey))
+
+
+def _fetch(url, survey):
+    with _survey_lock(survey):
+        meta = _read_meta(survey)
+        path = _cached_file(meta)
+        now = time.time()
+
+        # trust the cache for a while without asking nces
+        headers = {}
+        if path is not None:
+            if now - meta['checked'] < config.get_option('cache_revalidate'):
+                meta['used'] = now
+                _write_meta(survey, meta)
+                return (path)
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        # get the data, or confirm that what we have is current
+        try:
+            results = _download(url, survey, headers)
+        except requests.RequestException:
+            if path is not None:
+                return (path)
+            raise
+        if results is None:
+            meta['checked'] = now
+            meta['used'] = now
+            _write_meta(survey, meta)
+            return (path)
+
+        # save the new version and drop the one it replaces
+        part = _part_path(survey)
+        size = os.path.getsize(part)
+        digest, file = _promote(survey, part)
+        if path is not None and meta['file'] != file:
+            os.remove(path)
+        meta = {'survey': survey,
+                'url': url,
+                'sha256': digest,
+                'file': file,
+                'size': size,
+                'etag': results.get('ETag'),
+                'last_modified': results.get('Last-Modified'),
+                'checked': now,
+                'used': now}
+        _write_meta(survey, meta)
+
+    # the cache is trimmed by the reader once it is done with the zip, see using
+    return (os.path.join(cache_dir(), file))
+
+
+# ================================= streaming download
+
+class _Retry(Exception):
+    # a failed attempt that is worth trying again
+    pass
+
+
+def _download(url, survey, headers):
+    # returns the response headers once the zip is complete in the part file, or None if not modified
+    retries = config.get_option('download_retries')
+    for attempt in range(retries + 1):
+        try:
+            return (_attempt(url, survey, headers))
+        except (_Retry, requests.ConnectionError, requests.Timeout,
+                requests.exceptions.ChunkedEncodingError) as e:
+            if attempt == retries:
+                raise DownloadError('could not download {}: {}'.format(url, e))
+            # exponential backoff between attempts
+            time.sleep(config.get_option('download_backoff') * 2 ** attempt)
+
+
+def _attempt(url, survey, headers):
+    part = _part_path(survey)
+    tag = part + '.etag'
+    headers = dict(headers)
+
+    # resume a partial download, but only if it is still the same upstream file
+    done = os.path.getsize(part) if os.path.exists(part) else 0
+    if done > 0 and os.path.exists(tag):
+        with open(tag) as f:
+            etag = f.read()
+        if etag:
+            headers['Range'] = 'bytes={}-'.format(done)
+            headers['If-Range'] = etag
+
+    with _polite(url):
+        results = session().get(url, headers=headers, stream=True, timeout=60)
+        with results:
+            if results.status_code == 304:
+                for stale in [part, tag]:
+                    if os.path.exists(stale):
+                        os.remove(stale)
+                return (None)
+            if results.status_code == 429 or results.status_code >= 500:
+                raise _Retry('status {}'.format(results.status_code))
+            if results.status_code == 416:
+                os.remove(part)
+                raise _Retry('stale partial download')
+            results.raise_for_status()
+
+            # anything but a 206 is the whole file, so start the part over
+            if results.status_code != 206:
+                done = 0
+                with open(tag, 'w') as f:
+                    f.write(results.headers.get('ETag') or '')
+            with open(part, 'ab' if done > 0 else 'wb') as f:
+                for chunk in results.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+            # Content-Length counts the bytes sent, fewer than the bytes written when they are gzip encoded
+            expected = results.headers.get('Content-Length')
+            if expected is not None and results.raw.tell() != int(expected):
+                raise _Retry('incomplete download')
+
+    # never promote a zip that cannot be read back
+    try:
+        with zipfile.ZipFile(part) as file:
+            bad = file.testzip()
+    except zipfile.BadZipFile:
+        bad = part
+    if bad is not None:
+        os.remove(part)
+        raise _Retry('corrupt zip file')
+    os.remove(tag)
+    return (results.headers)
+
+
+# ================================= housekeeping
+
+def digest(survey):
+    """
+    Return the sha256 of the cached zip for a survey file, or None if it is not cached.
+
+    Parameters:
+        survey (str): the survey file id, for example HD2017
+    """
+
+    meta = _read_meta(survey)
+    if _cached_file(meta) is None:
+        return (None)
+    return (meta['sha256'])
+
+
+def entries():
+    """
+    Return a list of the metadata dictionaries for every survey file in the cache.
+    """
+
+    out = []
+    for name in sorted(os.listdir(cache_dir())):
+        if name.endswith('.json'):
+            meta = _read_meta(name[:-len('.json')])
+            if meta is not None:
+                out.append(meta)
+    return (out)
+
+
+def remove(survey):
+    """
+    Remove a survey file from the cache.
+
+    Parameters:
+        survey (str): the survey file id, for example HD2017
+    """
+
+    # another thread may be cleaning up the same file
+    for path in [_cached_file(_read_meta(survey)), _meta_path(survey)]:
+        try:
+            if path is not None:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def evict(max_bytes=None, max_age=None):
+    """
+    Remove cached zips by age and then by size, least recently used first.  Zips being read, see using, and
+    zips downloaded in the background but not read yet are kept.
+
+    Parameters:
+        max_bytes (int): keep the cache at or below this many bytes, defaults to config.options['cache_max_bytes']
+        max_age (int): remove zips not used within this many seconds, defaults to config.options['cache_max_age']
+    """
+
+    if max_bytes is None:
+        max_bytes = config.get_option('cache_max_bytes')
+    if max_age is None:
+        max_age = config.get_option('cache_max_age')
+    if max_bytes is None and max_age is None:
+        return
+
+    now = time.time()
+    busy = _pending()
+    with _lock:
+        busy = busy | set(_pins)
+    every = entries()
+    metas = sorted([m for m in every if m['survey'] not in busy], key=lambda m: m['used'])
+    if max_age is not None:
+        for meta in [m for m in metas if now - m['used'] > max_age]:
+            remove(meta['survey'])
+            metas.remove(meta)
+            every.remove(meta)
+    if max_bytes is not None:
+        # the zips in use count toward the limit, even though they are not removed
+        total = sum(m['size'] for m in every)
+        for meta in list(metas):
+            if total <= max_bytes:
+                break
+            remove(meta['survey'])
+            total -= meta['size']
+
+
+def clear():
+    """
+    Remove every survey file from the cache.
+    """
+
+    for meta in entries():
+        remove(meta['survey'])
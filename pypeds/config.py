@@ -0,0 +1,71 @@
+# package wide options shared by the download cache and the survey classes
+import os
+
+
+# the defaults, override with set_option or the environment variables noted below
+options = {
+    # root folder for everything pypeds keeps between sessions (PYPEDS_CACHE_DIR)
+    'cache_dir': os.environ.get('PYPEDS_CACHE_DIR',
+                                os.path.join(os.path.expanduser('~'), '.pypeds')),
+    # seconds a cached survey zip is trusted before it is revalidated with NCES
+    'cache_revalidate': 24 * 60 * 60,
+    # evict the least recently used zips once the cache grows past this many bytes, None to disable
+    'cache_max_bytes': None,
+    # evict zips that have not been used in this many seconds, None to disable
+    'cache_max_age': None,
+    # threads used to download survey zips in the background
+    'max_workers': 4,
+    # threads the views use to extract their surveys at the same time
+    'view_workers': 4,
+    # keep the result of each view, see views.materialized
+    'view_cache': True,
+    # views kept in memory, the least recently used are dropped first
+    'view_memo_size': 16,
+    # bytes of parsed survey years a registry.Session keeps in memory
+    'session_max_bytes': 2 * 1024 ** 3,
+    # at most this many downloads from the same host at once
+    'host_connections': 4,
+    # seconds to wait between starting two requests to the same host
+    'host_delay': 0.25,
+    # attempts made after a failed download before giving up
+    'download_retries': 4,
+    # seconds to wait after the first failed download, doubled for every attempt after that
+    'download_backoff': 1.0,
+    # rows parsed at a time when extract filters rows with where
+    'chunk_rows': 250000,
+    # the csv parser for read_survey, 'c' for pandas or 'pyarrow' for arrow's multithreaded reader
+    'engine': 'c',
+    # with the pyarrow engine, keep text columns as arrow backed strings instead of python objects
+    'arrow_strings': False,
+    # keep every parsed survey year as parquet under cache_dir/store, used when pyarrow is installed
+    'store': True,
+    # rows per parquet row group in the store
+    'store_row_group': 50000,
+    # seconds before the lookup tables in reference.py are refreshed in the background, None to never download
+    'reference_refresh': 30 * 24 * 60 * 60,
+}
+
+
+def get_option(key):
+    """
+    Return the current value of a pypeds option.
+
+    Parameters:
+        key (str): the name of the option, see config.options for the valid keys
+    """
+
+    assert key in options, 'unknown option: {}'.format(key)
+    return (options[key])
+
+
+def set_option(key, value):
+    """
+    Set a pypeds option for the rest of the session.
+
+    Parameters:
+        key (str): the name of the option, see config.options for the valid keys
+        value: the new value for the option
+    """
+
+    assert key in options, 'unknown option: {}'.format(key)
+    options[key] = value
@@ -1,5 +1,6 @@
 import pickle
 import pandas as pd
+from pypeds import reference
 
 
 def comp_graph1():
@@ -128,12 +129,11 @@ def closings():
 def region_xwalk():
     """
     Returns a dataframe that can be used to map states and regions
+
+    Read once per session, from the snapshot on disk or shipped with the package, see reference.py.
     """
 
-    url = "https://docs.google.com/spreadsheets/d/e/2PACX-1vQ62ZENWQnUf2XnRs7hiVn7XhXhuCdZdeEOK2-BgkhppEI_A0IMepafWx9vaenOdhQptz5HIwxq3ZAM/pub?gid=0&single=true&output=csv"
-    x = pd.read_csv(url)
-    x.columns = x.columns.str.lower()
-    return(x)
+    return(reference.table('region_xwalk'))
 
 
 def cipcodes():
@@ -143,10 +143,7 @@ def cipcodes():
     Source: The data dictionary for the Completions A survey
     """
 
-    url = "https://docs.google.com/spreadsheets/d/e/2PACX-1vSjBizdy0EdtUllMJVe0vtq4TIXzsLSR0hnpEyS31-ASx5zjEBkfgLLqOjaHRCtYxqWEVs8eqY0KWJF/pub?gid=0&single=true&output=csv"
-    x = pd.read_csv(url)
-    x.columns = x.columns.str.lower()
-    return(x)
+    return(reference.table('cipcodes'))
 
 
 def award_levels():
@@ -156,10 +153,7 @@ def award_levels():
     Source: The 2018 survey data dictionary for the Completions A survey
     """
 
-    url = "https://docs.google.com/spreadsheets/d/e/2PACX-1vQVh15c5xErMKdhMea1AIa3jnArpXXlsSY1NSR_laFaYvhlni3C9jP9DKcHkZqNIsAE18zfMPf0qZFu/pub?gid=0&single=true&output=csv"
-    x = pd.read_csv(url)
-    x.columns = x.columns.str.lower()
-    return(x)
+    return(reference.table('award_levels'))
 
 
 def cohort_default():
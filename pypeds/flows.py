@@ -0,0 +1,210 @@
+# the residence of first-time freshmen as a sparse state x institution matrix, for migration flows
+import threading
+import numpy as np
+import pandas as pd
+from pypeds import datasets
+from pypeds import views
+
+
+# the us (58) and grand (99) totals, every other line is a state or area of residence
+TOTAL_LINES = [58, 99]
+
+_lock = threading.Lock()
+_memo = {}
+
+
+def _sparse():
+    try:
+        import scipy.sparse
+    except ImportError:
+        raise ImportError('the migration matrix needs scipy, pip install pypeds[sparse]')
+    return (scipy.sparse)
+
+
+def _group(labels):
+    # a 0/1 matrix that adds the rows or columns with the same label together, missing labels are left out
+    sparse = _sparse()
+    labels = pd.Series(labels)
+    codes, names = pd.factorize(labels, sort=True)
+    keep = codes >= 0
+    found = sparse.csr_matrix((np.ones(keep.sum()), (np.flatnonzero(keep), codes[keep])),
+                              shape=(len(codes), len(names)))
+    return ((found, pd.Index(names)))
+
+
+class MigrationMatrix(object):
+    """
+    The first-time freshmen of one fall as a sparse matrix, with a row for each state (EF_C line) of residence
+    and a column for each institution.  Built once, see flows.matrix, and used for every question about the
+    flows: in-state shares, net flows between states and the top feeder states of each school.
+    """
+
+    def __init__(self, df, value='efres02', regions=None):
+        """
+        Parameters:
+            df (DataFrame): one row per institution and line, with unitid, line, fips (the state of the
+                            institution) and the value column, such as views.migration for one fall
+            value (str): the column counted, efres02 for the first-time freshmen who graduated high school
+                         in the past 12 months
+            regions (DataFrame): the region crosswalk, defaults to datasets.region_xwalk
+        """
+
+        sparse = _sparse()
+        if 'fall_year' in df.columns:
+            assert df.fall_year.nunique() <= 1, 'the migration matrix is for one fall, filter fall_year first'
+            self.fall_year = int(df.fall_year.iloc[0]) if len(df) > 0 else None
+        else:
+            self.fall_year = None
+        values = pd.to_numeric(df[value], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        keep = ~df.line.isin(TOTAL_LINES).to_numpy() & df.line.notna().to_numpy() & ~np.isnan(values) & (values != 0)
+        df = df.loc[keep]
+
+        # sorted codes, so the same line and unitid always get the same row and column
+        rows, self.line = pd.factorize(df.line.astype('int64'), sort=True)
+        cols, self.unitid = pd.factorize(df.unitid.astype('int64'), sort=True)
+        self.matrix = sparse.csr_matrix((values[keep], (rows, cols)), shape=(len(self.line), len(self.unitid)))
+        self.matrix.sum_duplicates()
+        self.line = pd.Index(self.line, name='line')
+        self.unitid = pd.Index(self.unitid, name='unitid')
+
+        # the state of each institution, the first one found
+        fips = df.drop_duplicates('unitid').set_index('unitid').fips
+        self.fips = pd.to_numeric(fips.reindex(self.unitid), errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        self.regions = regions if regions is not None else datasets.region_xwalk()
+
+    def _labels(self, codes, by, on):
+        # the state (the code itself), region or division of each fips code
+        if by == 'state':
+            return (pd.Series(codes).where(pd.Series(codes).notna()).astype('Int64').to_numpy())
+        assert by in self.regions.columns, 'unknown grouping: {}'.format(by)
+        names = self.regions.drop_duplicates(on).set_index(on)[by]
+        return (names.reindex(codes).to_numpy())
+
+    def aggregate(self, rows='state', cols='unitid'):
+        """
+        Return the matrix added up to coarser rows and columns, with the labels of each, as (matrix, rows, cols).
+        Lines and institutions without a label, such as foreign countries for a region, are left out.
+
+        Parameters:
+            rows (str): 'state' for the line of residence, or a column of the region crosswalk such as
+                        'region', 'division' or 'ipeds_region'
+            cols (str): 'unitid' for each institution, 'state' for the state of the institution, or a
+                        column of the region crosswalk
+        """
+
+        matrix = self.matrix
+        row_names = self.line
+        if rows != 'state':
+            group, row_names = _group(self._labels(self.line.to_numpy(), rows, 'ipeds_code'))
+            matrix = group.T @ matrix
+        col_names = self.unitid
+        if cols != 'unitid':
+            group, col_names = _group(self._labels(self.fips, cols, 'fips'))
+            matrix = matrix @ group
+        return ((matrix.tocsr(), row_names, col_names))
+
+    def totals(self):
+        """
+        Return the first-time freshmen of each institution, from every line of residence.
+        """
+
+        return (pd.Series(np.asarray(self.matrix.sum(axis=0)).ravel(), index=self.unitid, name='total'))
+
+    def in_state_share(self):
+        """
+        Return the share of the first-time freshmen of each institution who are from its own state.
+        """
+
+        coo = self.matrix.tocoo()
+        home = self.line.to_numpy()[coo.row] == self.fips[coo.col]
+        instate = np.bincount(coo.col[home], weights=coo.data[home], minlength=len(self.unitid))
+        total = self.totals().to_numpy()
+        share = np.divide(instate, total, out=np.full(len(total), np.nan), where=total != 0)
+        return (pd.Series(share, index=self.unitid, name='in_state_share'))
+
+    def net_flows(self):
+        """
+        Return the flows of each state, one row per state: the students who stay, the students who come from
+        other states (imports), the students who leave for other states (exports), and the net of the two.
+        """
+
+        matrix, lines, schools = self.aggregate(rows='state', cols='state')
+        states = lines.union(schools)
+        inflow = np.zeros(len(states))
+        inflow[states.get_indexer(schools)] = np.asarray(matrix.sum(axis=0)).ravel()
+        outflow = np.zeros(len(states))
+        outflow[states.get_indexer(lines)] = np.asarray(matrix.sum(axis=1)).ravel()
+        # the students who stay are on the diagonal, where the line and the state of the school are the same
+        both = lines.intersection(schools)
+        stay = np.zeros(len(states))
+        stay[states.get_indexer(both)] = matrix[lines.get_indexer(both)][:, schools.get_indexer(both)].diagonal()
+        imports = inflow - stay
+        exports = outflow - stay
+        return (pd.DataFrame({'stay': stay, 'imports': imports, 'exports': exports, 'net': imports - exports},
+                             index=pd.Index(states, name='fips')))
+
+    def top_feeders(self, k=5):
+        """
+        Return the k lines of residence with the most first-time freshmen for each institution, one row per
+        institution and line, with the count and the share of the institution's freshmen.
+
+        Parameters:
+            k (int): the number of lines for each institution
+        """
+
+        coo = self.matrix.tocoo()
+        # by institution, then the most students first
+        order = np.lexsort((-coo.data, coo.col))
+        col = coo.col[order]
+        starts = np.searchsorted(col, col, side='left')
+        rank = np.arange(len(col)) - starts
+        keep = order[rank < k]
+        total = self.totals().to_numpy()
+        df = pd.DataFrame({'unitid': self.unitid.to_numpy()[coo.col[keep]],
+                           'rank': rank[rank < k],
+                           'line': self.line.to_numpy()[coo.row[keep]],
+                           'count': coo.data[keep],
+                           'share': coo.data[keep] / total[coo.col[keep]]})
+        return (df)
+
+
+def matrix(fall_year=2017, value='efres02', hd_deg4yr=True, hd_service=True, hd_lower48=None, session=None):
+    """
+    Return the MigrationMatrix of a fall, from views.migration.  It is built once per fall and filter, so every
+    later question is answered from the same matrix.
+
+    Parameters:
+        fall_year (int): the fall of the EF_C survey
+        value (str): the column counted, efres02 for the first-time freshmen who graduated high school in the past 12 months
+        hd_deg4yr (bool): boolean (default = True) as to filter to only include degree-granting 4-year institutions
+        hd_service (bool): boolean (default = True) which if True, will remove US service schools
+        hd_lower48 (bool): boolean (default = None) while if True, will only keep lower 48 states
+        session (Session): read the surveys through this registry, see registry.py
+    """
+
+    key = (int(fall_year), value, hd_deg4yr, hd_service, hd_lower48)
+    with _lock:
+        found = _memo.get(key)
+    if found is not None:
+        return (found)
+
+    df = views.migration(years=[int(fall_year)],
+                         efc_cols=['unitid', 'fall_year', 'line', value],
+                         hd_deg4yr=hd_deg4yr,
+                         hd_service=hd_service,
+                         hd_lower48=hd_lower48,
+                         hd_cols=['unitid', 'fall_year', 'fips'],
+                         session=session)
+    found = MigrationMatrix(df, value=value)
+    with _lock:
+        _memo[key] = found
+    return (found)
+
+
+def clear():
+    """
+    Forget the migration matrices built so far.
+    """
+
+    with _lock:
+        _memo.clear()
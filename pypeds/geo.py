@@ -0,0 +1,216 @@
+# nearest institution and radius queries on the latitude and longitude of HD, with a kd-tree built once per year
+import threading
+import numpy as np
+import pandas as pd
+from pypeds import ipeds
+
+
+# the mean radius of the earth
+EARTH_MILES = 3958.8
+
+_lock = threading.Lock()
+_memo = {}
+
+
+def _tree(points):
+    try:
+        from scipy.spatial import cKDTree
+    except ImportError:
+        raise ImportError('the geo queries need scipy, pip install pypeds[geo]')
+    return (cKDTree(points))
+
+
+def _xyz(lat, lon):
+    # points on the unit sphere, where the straight line distance grows with the great circle distance
+    lat = np.radians(np.asarray(lat, dtype='float64'))
+    lon = np.radians(np.asarray(lon, dtype='float64'))
+    return (np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1))
+
+
+def _miles(chord):
+    # the great circle distance for a straight line distance on the unit sphere
+    return (2 * EARTH_MILES * np.arcsin(np.clip(chord / 2, 0, 1)))
+
+
+def _chord(miles):
+    return (2 * np.sin(np.minimum(miles / EARTH_MILES, np.pi) / 2))
+
+
+class Index(object):
+    """
+    A kd-tree over the institutions of one HD survey year, for k nearest and within N miles queries.
+
+    The points are put on the unit sphere, so the tree gives great circle distances without a haversine for
+    every pair.  Many query points are answered in one call, see nearest and within.
+    """
+
+    def __init__(self, df):
+        """
+        Parameters:
+            df (DataFrame): institutions with unitid, latitude and longitud, such as an extracted HD survey
+        """
+
+        df = df.loc[df.latitude.notna() & df.longitud.notna()].reset_index(drop=True)
+        self.df = df
+        self.unitid = df.unitid.to_numpy(dtype='int64')
+        self.tree = _tree(_xyz(df.latitude, df.longitud))
+
+    def __len__(self):
+        return (len(self.df))
+
+    def _points(self, lat=None, lon=None, unitid=None):
+        # the query points and their labels, from coordinates or from institutions of the index
+        if unitid is not None:
+            unitid = np.atleast_1d(np.asarray(unitid, dtype='int64'))
+            order = np.argsort(self.unitid)
+            at = np.minimum(np.searchsorted(self.unitid, unitid, sorter=order), max(len(order) - 1, 0))
+            rows = order[at]
+            assert len(rows) > 0 and (self.unitid[rows] == unitid).all(), 'unitid not in the index'
+            return ((self.tree.data[rows], unitid))
+        assert lat is not None and lon is not None, 'give lat and lon, or unitid'
+        points = _xyz(np.atleast_1d(lat), np.atleast_1d(lon))
+        return ((points, np.arange(len(points))))
+
+    def nearest(self, lat=None, lon=None, k=5, unitid=None):
+        """
+        Return the k nearest institutions of each query point, one row per query point and neighbor, nearest first.
+
+        Parameters:
+            lat (float or list): the latitude of each query point
+            lon (float or list): the longitude of each query point
+            k (int): the number of institutions to return for each point
+            unitid (int or list): query from these institutions instead, they are not counted as their own neighbor
+        """
+
+        points, labels = self._points(lat, lon, unitid)
+        if unitid is not None:
+            # one more, since each institution is its own nearest
+            return (_drop_self(self._nearest(points, labels, k + 1), k))
+        return (self._nearest(points, labels, k))
+
+    def within(self, lat=None, lon=None, miles=50, unitid=None):
+        """
+        Return the institutions within a distance of each query point, one row per query point and institution,
+        nearest first.
+
+        Parameters:
+            lat (float or list): the latitude of each query point
+            lon (float or list): the longitude of each query point
+            miles (float): the radius
+            unitid (int or list): query from these institutions instead, they are not included in their own results
+        """
+
+        points, labels = self._points(lat, lon, unitid)
+        if unitid is not None:
+            return (_drop_self(self._within(points, labels, miles)))
+        return (self._within(points, labels, miles))
+
+    def _nearest(self, points, labels, k):
+        k = min(k, len(self))
+        chord, rows = self.tree.query(points, k=k)
+        chord = np.asarray(chord).reshape(len(points), k)
+        rows = np.asarray(rows).reshape(len(points), k)
+        df = pd.DataFrame({'query': np.repeat(labels, k),
+                           'rank': np.tile(np.arange(k), len(points)),
+                           'unitid': self.unitid[rows.ravel()],
+                           'miles': _miles(chord.ravel())})
+        return (df)
+
+    def _within(self, points, labels, miles):
+        # every match of every point in one call, then flattened into long rows
+        found = self.tree.query_ball_point(points, r=_chord(miles))
+        counts = np.array([len(f) for f in found], dtype='int64')
+        rows = np.concatenate([np.asarray(f, dtype='int64') for f in found] + [np.zeros(0, dtype='int64')])
+        query = np.repeat(np.arange(len(points)), counts)
+        distance = _miles(np.linalg.norm(self.tree.data[rows] - points[query], axis=1))
+        df = pd.DataFrame({'query': labels[query], 'unitid': self.unitid[rows], 'miles': distance})
+        return (df.sort_values(['query', 'miles'], kind='stable').reset_index(drop=True))
+
+
+def index(year=2017, sector=None, deg4yr=False):
+    """
+    Return the kd-tree Index of the institutions in an HD survey year.  It is built once per year and filter.
+
+    Parameters:
+        year (int): the HD survey year
+        sector (list): only keep institutions in these HD sectors, None for all of them
+        deg4yr (bool): if True, keep only public/private non profit 4-year that are degree granting
+    """
+
+    key = (int(year), tuple(sorted(sector)) if sector is not None else None, bool(deg4yr))
+    with _lock:
+        found = _memo.get(key)
+    if found is not None:
+        return (found)
+
+    hd = ipeds.HD(years=[int(year)], lazy=True)
+    hd.extract(cols=['unitid', 'instnm', 'sector', 'pset4flg', 'deggrant', 'latitude', 'longitud'])
+    hd.transform(deg4yr=deg4yr)
+    df = hd.load()
+    if sector is not None:
+        df = df.loc[df.sector.isin(list(sector))]
+    found = Index(df)
+    with _lock:
+        _memo[key] = found
+    return (found)
+
+
+def nearest(unitid=None, lat=None, lon=None, k=5, year=2017, sector=None, deg4yr=False):
+    """
+    Return the k nearest institutions of each query point or institution, see Index.nearest.
+
+    Parameters:
+        unitid (int or list): query from these institutions
+        lat (float or list): or query from these latitudes
+        lon (float or list): and longitudes
+        k (int): the number of institutions to return for each query
+        year (int): the HD survey year
+        sector (list): only return institutions in these HD sectors
+        deg4yr (bool): if True, only return degree granting 4-year institutions
+    """
+
+    found = index(year=year, sector=sector, deg4yr=deg4yr)
+    if unitid is not None:
+        # the query institutions may be outside of the filters, so find them in the whole year
+        points, labels = index(year=year)._points(unitid=unitid)
+        return (_drop_self(found._nearest(points, labels, k + 1), k))
+    return (found.nearest(lat=lat, lon=lon, k=k))
+
+
+def within(unitid=None, lat=None, lon=None, miles=50, year=2017, sector=None, deg4yr=False):
+    """
+    Return the institutions within a distance of each query point or institution, see Index.within.
+
+    Parameters:
+        unitid (int or list): query from these institutions
+        lat (float or list): or query from these latitudes
+        lon (float or list): and longitudes
+        miles (float): the radius
+        year (int): the HD survey year
+        sector (list): only return institutions in these HD sectors
+        deg4yr (bool): if True, only return degree granting 4-year institutions
+    """
+
+    found = index(year=year, sector=sector, deg4yr=deg4yr)
+    if unitid is not None:
+        points, labels = index(year=year)._points(unitid=unitid)
+        return (_drop_self(found._within(points, labels, miles)))
+    return (found.within(lat=lat, lon=lon, miles=miles))
+
+
+def _drop_self(df, k=None):
+    # each query institution is left out of its own results, then k of the rest are kept
+    df = df.loc[df.unitid != df['query']].reset_index(drop=True)
+    if k is not None:
+        df['rank'] = df.groupby('query').cumcount()
+        df = df.loc[df['rank'] < k].reset_index(drop=True)
+    return (df)
+
+
+def clear():
+    """
+    Forget the kd-trees built so far.
+    """
+
+    with _lock:
+        _memo.clear()
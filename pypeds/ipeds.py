@@ -1,77 +1,378 @@
 # lower level features to collect ipeds survey datasets
 import pandas as pd
+import numpy as np
 import os
 import requests
 import zipfile
-import glob
+import collections
+import contextlib
+import csv
 import re
 import time
-import datetime
+import warnings
 from dfply import *
 from pypeds import datasets
+from pypeds import cache
+from pypeds import config
+from pypeds import schemas
+from pypeds import store
 # ================================= core features
 
-# zip file factory - returns a pandas dataframe
+# a csv file inside of a cached survey zip, see zip_parser
+SurveyFile = collections.namedtuple('SurveyFile', ['zip', 'member', 'survey'])
+
+
+# zip file factory - returns the survey csv to read
 
 
 def zip_parser(url=None, survey=None):
-    # setup the tmp path and file name
-    # thanks to https://stackoverflow.com/questions/55718917/download-zip-file-locally-to-tempfile-extract-files-to-tempfile-and-list-the-f/55719124#55719124
-    # path = "/tmp/pypeds/" + str(int(time.time())) + "/"  # hacky way to make unique path to extract time
-    _today = datetime.datetime.today().strftime('%Y%m%d')
+    # the zip itself lives in the persistent cache, see cache.fetch for when it is downloaded again
+    zip_path = cache.fetch(url=url, survey=survey)
     survey_lower = survey.lower()
-    # hacky way to make unique path to extract date and survey
-    path = "/tmp/" + str(_today) + str(survey_lower) + "/"
-    file = survey + ".zip"
-
-    # naive way to do cacheing - if the path for today exists, dont do anything, if it doesnt, get the data
-    if not os.path.exists(path):
-        os.makedirs(path)
-    if not os.path.exists(path + file):
-        # get the data
-        try:
-            results = requests.get(url)
-        except:
-            pass
-        with open(path + file, 'wb') as f:
-            f.write(results.content)
-
-    # extract the files to the path
-    file = zipfile.ZipFile(path + file)
-    file.extractall(path=path)
     # list the csv files for the surveys, most likely get one , but may get to with _rv for revised
-    files = glob.glob(path + "*" + survey_lower + "*")
-    # files = [x.lower() for x in files]  ## removed for regex search below
-    # isolate the file name
-    if len(files) > 1:
-        # use regex to search -- 2006 migration
-        raw_file = [s if re.search('rv|RV', s) else s for s in files]
-        raw_file = str(raw_file[0])  # just in case, take first
+    with zipfile.ZipFile(zip_path) as file:
+        files = [f for f in file.namelist() if f.lower().endswith('.csv')]
+    if len([f for f in files if survey_lower in f.lower()]) > 0:
+        files = [f for f in files if survey_lower in f.lower()]
+    # isolate the file name, the revised file wins -- 2006 migration
+    revised = [f for f in files if re.search('_rv', f, re.IGNORECASE)]
+    if len(revised) > 0:
+        raw_file = revised[0]
     else:
-        raw_file = str(files[0])
-    # return a string
-    return (str(raw_file))
+        raw_file = files[0]
+    # nothing is extracted, read_survey streams the member out of the zip
+    return (SurveyFile(zip_path, raw_file, survey))
+
+
+class _Unreadable(Exception):
+    # the survey csv is missing from its zip, or cannot be parsed even without the schema
+    pass
 
 
-def read_survey(path):
+class _WhereError(Exception):
+    # an error raised by the where function of the caller, raised again as is by read_survey
+    pass
+
+
+def _guarded(where):
+    # tell the errors of a where function apart from the errors of the file
+    if not callable(where):
+        return (where)
+
+    def run(df):
+        try:
+            return (where(df))
+        except Exception as e:
+            raise _WhereError(e)
+    return (run)
+
+
+# the errors of a survey file that cannot be parsed, anything else (such as an error in a where function) is raised
+_PARSE_ERRORS = (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError, csv.Error,
+                 zipfile.BadZipFile, _Unreadable)
+
+
+@contextlib.contextmanager
+def _open(path):
+    # a fresh handle on the csv, whether it is inside a zip or not
+    if isinstance(path, SurveyFile):
+        with zipfile.ZipFile(path.zip) as file:
+            try:
+                member = file.open(path.member)
+            except KeyError:
+                raise _Unreadable('{} is not in {}'.format(path.member, path.zip))
+            with member as f:
+                yield (f)
+    else:
+        with open(path, 'rb') as f:
+            yield (f)
+
+
+def _header(path):
+    # the column names exactly as they are written in the csv
+    with _open(path) as f:
+        line = f.readline().decode('ISO-8859-1')
+    return (next(csv.reader([line])))
+
+
+def _coerce(df, types):
+    # apply the schema after the fact, values that do not fit become missing
+    for col, dtype in types.items():
+        if col not in df.columns:
+            continue
+        if dtype in [str, 'category']:
+            df[col] = df[col].astype(dtype)
+        else:
+            values = pd.to_numeric(df[col], errors='coerce')
+            try:
+                df[col] = values.astype(dtype)
+            except (ValueError, TypeError):
+                df[col] = values
+    return (df)
+
+
+def _mask(df, where, strict=False):
+    # a boolean row mask for a where dict or function, missing values never match
+    if callable(where):
+        mask = pd.Series(where(df), index=df.index)
+    else:
+        mask = pd.Series(True, index=df.index)
+        for col, value in where.items():
+            if strict:
+                # a transform filter on a column that was not extracted, or that a select dropped
+                _missing([col], df.columns)
+            if col not in df.columns:
+                # the column is not in this survey year, so nothing can match
+                return (pd.Series(False, index=df.index))
+            if isinstance(value, (list, tuple, set)):
+                mask = mask & df[col].isin(list(value))
+            else:
+                mask = mask & (df[col] == value)
+    return (mask.fillna(False).astype(bool))
+
+
+def _missing(cols, columns):
+    # the columns of a filter that are not in the data, an error for a transform filter
+    missing = [] if columns is None else [col for col in cols if col not in columns]
+    if len(missing) > 0:
+        raise KeyError('cannot filter on {}, not a column of the data'.format(', '.join(missing)))
+
+
+def _concat(frames):
+    # concat turns categoricals with different categories into object, so align the categories first
+    cats = {}
+    for df in frames:
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                cats.setdefault(col, [])
+                cats[col] += [c for c in df[col].cat.categories if c not in cats[col]]
+    for df in frames:
+        for col, values in cats.items():
+            if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].cat.set_categories(values)
+    return (pd.concat(frames, ignore_index=True, sort=False))
+
+
+def _rows(reader, where, types=None):
+    # the parsed csv, or its chunks, with lower case column names and only the rows that match where
+    chunks = [reader] if isinstance(reader, pd.DataFrame) else reader
+    keep = []
+    for chunk in chunks:
+        if types is not None:
+            chunk = _coerce(chunk, types)
+        chunk.columns = chunk.columns.str.strip().str.lower()
+        if where is not None:
+            chunk = chunk.loc[_mask(chunk, where)]
+        keep.append(chunk)
+    if len(keep) == 1:
+        return (keep[0])
+    return (_concat(keep))
+
+
+# pandas dtypes from the schemas and what arrow should parse them as
+_ARROW_TYPES = {'Int8': 'int8', 'Int16': 'int16', 'Int32': 'int32', 'int32': 'int32',
+                'float32': 'float32', 'float64': 'float64'}
+
+
+def _arrow():
+    # pyarrow is only needed when the pyarrow engine is asked for
+    try:
+        import pyarrow as pa
+        from pyarrow import csv as pacsv
+    except ImportError:
+        raise ImportError("engine='pyarrow' needs the pyarrow package: pip install pyarrow")
+    return (pa, pacsv)
+
+
+def _read_arrow(path, types, usecols, where, typed=True):
+    # arrow's multithreaded csv reader
+    pa, pacsv = _arrow()
+
+    # text and categorical columns are read as text, so codes such as zip 02138 keep their leading zeros
+    column_types = {col: pa.string() for col, dtype in types.items() if dtype in [str, 'category']}
+    if typed:
+        column_types.update({col: getattr(pa, _ARROW_TYPES[str(dtype)])()
+                             for col, dtype in types.items() if str(dtype) in _ARROW_TYPES})
+    read_options = pacsv.ReadOptions(encoding='ISO-8859-1', use_threads=True)
+    convert_options = pacsv.ConvertOptions(column_types=column_types,
+                                           include_columns=usecols,
+                                           null_values=pacsv.ConvertOptions().null_values + schemas.NA_VALUES,
+                                           strings_can_be_null=True)
+
+    # nullable ints stay nullable ints, text is arrow backed if asked for
+    mapping = {pa.int8(): pd.Int8Dtype(), pa.int16(): pd.Int16Dtype(), pa.int32(): pd.Int32Dtype()}
+    if config.get_option('arrow_strings'):
+        mapping[pa.string()] = pd.StringDtype('pyarrow')
+        types = {col: dtype for col, dtype in types.items() if dtype is not str}
+
+    def frames(tables):
+        for table in tables:
+            # the schema still decides the final dtype, e.g. int32 ids and categoricals
+            yield (_coerce(table.to_pandas(types_mapper=mapping.get), types))
+
+    with _open(path) as f:
+        if where is None:
+            table = pacsv.read_csv(f, read_options=read_options, convert_options=convert_options)
+            return (_rows(next(frames([table])), where))
+        # filtered reads stream record batches instead of reading the whole table
+        reader = pacsv.open_csv(f, read_options=read_options, convert_options=convert_options)
+        return (_rows(frames(pa.Table.from_batches([batch]) for batch in reader), where))
+
+
+def read_survey(path, cols=None, where=None, engine=None):
+    """
+    Parse a survey csv into a dataframe with lower case column names.
+
+    Parameters:
+        path: a SurveyFile from zip_parser, or a path to a csv
+        cols (list): only parse these columns, plus the survey's key columns.  Default None parses every column.
+        where (dict or function): keep only the matching rows, evaluated chunk by chunk while parsing.
+                                  Either a dict of column: value (or list of values), or a function that
+                                  takes a dataframe with lower case columns and returns a boolean mask.
+        engine (str): 'c' for the pandas parser or 'pyarrow' for arrow's multithreaded csv reader.
+                      Defaults to config.options['engine'].
+    """
+
     if isinstance(path, list):
         path = path[0]
-    # assumes a path, presumably from zip_parser
+    # assumes a SurveyFile from zip_parser, or a path to a csv
+    if isinstance(path, SurveyFile):
+        survey = path.survey
+    else:
+        survey = os.path.basename(str(path))
+    # the columns a where dict filters on have to be parsed as well
+    if cols is not None and isinstance(where, dict):
+        cols = list(cols) + list(where)
+    if engine is None:
+        engine = config.get_option('engine')
+    assert engine in ['c', 'pyarrow'], "engine must be 'c' or 'pyarrow'"
+    if engine == 'pyarrow':
+        _arrow()
+    # filtered reads go a chunk at a time so only the matching rows are ever held
+    chunksize = None
+    if where is not None:
+        chunksize = config.get_option('chunk_rows')
+    where = _guarded(where)
     try:
-        # encoding option needed for h2017, at least, wasnt needed for IC2013
-        survey_file = pd.read_csv(path, encoding='ISO-8859-1')
-    except:
+        # the compact dtypes and missing value codes registered for the survey family, see schemas.py
+        fam = schemas.family(survey)
+        header = _header(path)
+        # skip the columns that are not wanted while parsing, not after
+        if cols is not None:
+            header = schemas.usecols(fam, header, cols)
+        types = schemas.dtypes(fam, header)
+        if engine == 'pyarrow':
+            try:
+                survey_file = _read_arrow(path, types, header, where)
+            except (ValueError, TypeError, KeyError):
+                # a value the schema did not expect, parse without it and coerce
+                try:
+                    survey_file = _read_arrow(path, types, header, where, typed=False)
+                except (ValueError, KeyError) as e:
+                    raise _Unreadable(str(e))
+        else:
+            try:
+                # encoding option needed for h2017, at least, wasnt needed for IC2013
+                with _open(path) as f:
+                    survey_file = _rows(pd.read_csv(f, encoding='ISO-8859-1', dtype=types, usecols=header,
+                                                    na_values=schemas.NA_VALUES, chunksize=chunksize),
+                                        where)
+            except (ValueError, TypeError):
+                # a value the schema did not expect, parse without it and coerce
+                try:
+                    with _open(path) as f:
+                        survey_file = _rows(pd.read_csv(f, encoding='ISO-8859-1', usecols=header, low_memory=False,
+                                                        na_values=schemas.NA_VALUES, chunksize=chunksize),
+                                            where, types)
+                except ValueError as e:
+                    raise _Unreadable(str(e))
+    except _WhereError as e:
+        # the where function failed, not the file
+        raise e.args[0]
+    except _PARSE_ERRORS:
         # need to pass in a list to avoid
         # ValueError: If using all scalar values, you must pass an index
-        survey_file = pd.DataFrame([{'path': path}])
-    # remove the file
-    os.remove(path)
+        survey_file = pd.DataFrame([{'path': str(path)}])
     # column names to lower - helps later and assumes a survey varname is historically unique
     survey_file.columns = survey_file.columns.str.lower()
     # add the survey
     return (survey_file)
 
 
+def read_year(year_info, year, fall_year, cols=None, where=None, timings=None):
+    """
+    Return one survey year as a dataframe, with the survey_year and fall_year columns added.
+
+    When the store is enabled (see store.py), the survey file is parsed once per version and kept as
+    parquet, and every later read only loads the columns and row groups it needs.  A read with cols or where
+    of a year not in the store yet parses only what it asks for, and leaves the store as it is.
+
+    Parameters:
+        year_info (dict): the url and survey id, as returned by get_hd and friends
+        year (int): the survey year
+        fall_year (int): the fall of the academic year the survey reports on
+        cols (list): only keep these columns, plus the survey's key columns
+        where (dict or function): keep only the matching rows, see read_survey
+        timings (list): if given, a dictionary with the seconds spent is appended for each step
+    """
+
+    # the zip is kept in the cache until it has been read
+    with cache.using([year_info['survey']]):
+        return (_read_one(year_info, year, fall_year, cols=cols, where=where, timings=timings))
+
+
+def _read_one(year_info, year, fall_year, cols=None, where=None, timings=None):
+    def timed(step, started):
+        if timings is not None:
+            timings.append({'survey': year_info['survey'], 'year': year, 'step': step,
+                            'seconds': time.perf_counter() - started})
+
+    started = time.perf_counter()
+    year_fpath = zip_parser(url=year_info['url'], survey=year_info['survey'])
+    timed('download', started)
+    narrow = cols is not None or where is not None
+    if store.enabled() and (not narrow or os.path.exists(_partition_path(year_info, year))):
+        started = time.perf_counter()
+        part = _stored(year_info, year, fall_year, year_fpath)
+        if not isinstance(part, str):
+            # the csv could not be parsed, nothing worth keeping
+            return (part)
+        timed('parse', started)
+        started = time.perf_counter()
+        keys = schemas.KEYS.get(schemas.family(year_info['survey']), ['unitid'])
+        df = store.read(part, cols=cols, keys=keys, where=where)
+        timed('store', started)
+        return (df)
+    started = time.perf_counter()
+    df = _normalize(read_survey(year_fpath, cols=cols, where=where), year, fall_year)
+    timed('parse', started)
+    return (df)
+
+
+def _partition_path(year_info, year):
+    return (store.partition(year_info['survey'], year, cache.digest(year_info['survey'])))
+
+
+def _stored(year_info, year, fall_year, year_fpath):
+    # the parquet file of a survey year, parsed and written on first use.  The parsed dataframe if it has no unitid
+    part = _partition_path(year_info, year)
+    if not os.path.exists(part):
+        full = _normalize(read_survey(year_fpath), year, fall_year)
+        if 'unitid' not in full.columns:
+            return (full)
+        store.write(full, part)
+    return (part)
+
+
+def _normalize(df, year, fall_year):
+    # tidy column names and tag the rows with the year they came from
+    df.columns = df.columns.str.lower()
+    df.columns = df.columns.str.strip()
+    df['survey_year'] = int(year)
+    df['fall_year'] = int(fall_year)
+    return (df)
+
+
 # ================================= utilities to build url data
 
 # build a valid ipeds survey url - return a dict with a survey key and url for download
@@ -213,68 +514,727 @@ def get_cdep(year):
 # ================================= build the classes
 
 
-class HD(object):
+def _accumulate(frames):
     """
-    Directory Information from the Institutional Characteristics survey.
-    Currently supports the years 2002 - 2018.
+    Combine the per year dataframes into one, in a single concat.
 
-    Methods are extract, transform, and load.
+    The columns are the union across years, in the order they first appear, and categoricals are given
+    the same categories first so they are not turned into object columns.
+
+    Parameters:
+        frames (list): the dataframes to stack
     """
 
-    def __init__(self, years=[2017]):
-        """
-        The constructor for the HD survey
+    frames = [df for df in frames if len(df.columns) > 0]
+    if len(frames) == 0:
+        return (pd.DataFrame())
+    return (_concat(frames))
+
+
+# ================================= transform plans
+
+# one transform step
+#   filter: arg is a where dict or function as in read_survey, cols are the columns it reads
+#   label: arg returns the lookup table whose columns are added for the code in on, see decode
+#   mutate: arg takes and returns the dataframe, cols are the columns it reads and adds the ones it writes
+#   select: arg is the list of columns to keep
+Step = collections.namedtuple('Step', ['kind', 'arg', 'cols', 'on', 'adds'])
+
+
+def _filter(where, cols=None):
+    # a dict filter reads its own keys
+    if cols is None and isinstance(where, dict):
+        cols = list(where)
+    return (Step('filter', where, cols, None, None))
+
+
+def _label(table, on):
+    return (Step('label', table, None, [on], None))
+
+
+def _mutate(func, cols, adds):
+    return (Step('mutate', func, cols, None, adds))
+
 
+# kept with the rows by every select, so extract can tell the years apart, see Survey.hidden
+_YEARS = ['survey_year', 'fall_year']
+
+# the where of a year after a transform dropped some of its rows, which rows are left is not known
+_SOME_ROWS = object()
+
+
+def _select(cols):
+    return (Step('select', cols, list(cols) + [c for c in _YEARS if c not in cols], None, None))
+
+
+def _fuse(filters):
+    # one step, one mask and one copy, for a run of filters
+    wheres = [f.arg for f in filters]
+    cols = [c for f in filters for c in f.cols] if all(f.cols is not None for f in filters) else None
+
+    def where(df):
+        mask = _mask(df, wheres[0], strict=True)
+        for w in wheres[1:]:
+            mask = mask & _mask(df, w, strict=True)
+        return (mask)
+
+    return (_filter(where, cols=cols))
+
+
+def _positions(keys, codes):
+    # the row of keys that holds each code, -1 if the code is not there
+    is_int = pd.api.types.is_integer_dtype
+    if is_int(keys) and is_int(codes) and len(keys) > 0 and keys.min() >= 0 and keys.max() < 2 ** 16:
+        # small integer codes such as fips, line or awlevel, an array lookup is faster than hashing
+        top = int(keys.max())
+        lookup = np.full(top + 2, -1, dtype='int64')
+        lookup[keys.to_numpy(dtype='int64')] = np.arange(len(keys))
+        values = codes.to_numpy(dtype='int64', na_value=-1, copy=True)
+        values[(values < 0) | (values > top)] = top + 1
+        return (lookup[values])
+    if pd.api.types.is_numeric_dtype(keys) and pd.api.types.is_numeric_dtype(codes):
+        # compared as floats, so Int8 codes line up with the float64 of a csv
+        keys = keys.astype('float64')
+        codes = codes.astype('float64')
+    return (pd.Index(keys).get_indexer(codes))
+
+
+def decode(df, table, on):
+    """
+    Add the columns of a lookup table to a dataframe for the code in one of its columns, such as the cip
+    code labels.  Unlike a merge, the rows of df are never copied or repeated: each code is looked up by
+    position in the lookup table, the first row wins if a code is listed twice, and codes that are not in
+    the table get missing values.  Text labels are added as categoricals.  When the table is the snapshot
+    shipped with the package, a code that is not in it raises a warning, since the table may just be older.
+
+    Returns df, with the label columns added in place.
+
+    Parameters:
+        df (DataFrame): the survey data
+        table (DataFrame): the lookup table, for example datasets.cipcodes()
+        on (str): the code column, in both df and table
+    """
+
+    bundled = table.attrs.get('bundled', False)
+    table = table.loc[table[on].notna()].drop_duplicates(subset=[on], keep='first')
+    pos = _positions(table[on], df[on])
+    missing = pos == -1
+
+    unknown = missing & df[on].notna().to_numpy(dtype=bool)
+    if bundled and unknown.any():
+        codes = df[on][unknown].unique()
+        warnings.warn('{} {} codes, such as {}, have no label in the lookup table shipped with pypeds, '
+                      'call reference.refresh() to download the current table'.format(
+                          len(codes), on, ', '.join(str(c) for c in codes[:5])))
+
+    for col in table.columns:
+        if col == on:
+            continue
+        values = table[col]
+        if pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+            # a handful of labels repeated over many rows, store each once
+            labels, uniques = pd.factorize(values)
+            label_codes = labels[pos]
+            label_codes[missing] = -1
+            df[col] = pd.Categorical.from_codes(label_codes, categories=uniques)
+        else:
+            df[col] = pd.api.extensions.take(values.array, pos, allow_fill=True)
+    return (df)
+
+
+def _run(df, steps, needs=None):
+    """
+    Run transform steps over a dataframe, in order.
+
+    Parameters:
+        df (DataFrame): the extracted survey data
+        steps (list): Step tuples, see _filter, _label, _mutate and _select
+        needs (list): for each step, the columns still needed from there on, None to keep them all
+    """
+
+    for i, step in enumerate(steps):
+        if step.kind == 'filter':
+            df = df.loc[_mask(df, step.arg, strict=True)]
+        elif step.kind == 'label':
+            # drop what nothing downstream uses before the labels are added
+            if needs is not None and needs[i] is not None:
+                df = df[[c for c in df.columns if c in needs[i]]]
+            table = step.arg() if callable(step.arg) else step.arg
+            df = decode(df, table, step.on[0])
+        elif step.kind == 'mutate':
+            df = step.arg(df)
+        elif step.kind == 'select':
+            df = df >> select(list(step.arg) + [c for c in _YEARS if c in df.columns and c not in step.arg])
+    return (df)
+
+
+def _optimize(steps):
+    """
+    Rewrite a transform plan so it runs in one pass.
+
+    Returns a tuple of (where, steps, needs): the dict filters that can be applied while the survey is parsed,
+    the remaining steps with the filters on survey columns moved to the front and every run of filters fused
+    into one, and the columns each step needs from the frame it is given (see _run), None for all of them.
+
+    Parameters:
+        steps (list): Step tuples in the order transform was called
+    """
+
+    # the lookup tables are small, load them once so their columns are known
+    steps = [s._replace(arg=s.arg(), adds=None) if s.kind == 'label' and callable(s.arg) else s for s in steps]
+    steps = [s._replace(adds=[c for c in s.arg.columns if c not in s.on]) if s.kind == 'label' else s
+             for s in steps]
+
+    # a filter on columns of the survey itself gives the same rows before or after the labels and new columns,
+    # but not before a select that drops its columns, where it has to fail as it would eagerly
+    front = []
+    rest = []
+    added = set()
+    kept = None
+    for step in steps:
+        if (step.kind == 'filter' and step.cols is not None and not added.intersection(step.cols) and
+                (kept is None or set(step.cols) <= kept)):
+            front.append(step)
+        else:
+            rest.append(step)
+            added.update(step.adds or [])
+            if step.kind == 'select':
+                kept = set(step.cols) if kept is None else kept & set(step.cols)
+
+    # equality and isin filters can be applied as the csv is parsed
+    where = {}
+    kept = []
+    for step in front:
+        if isinstance(step.arg, dict) and not set(step.arg).intersection(where):
+            where.update(step.arg)
+        else:
+            kept.append(step)
+
+    # fuse each run of filters into one mask
+    fused = []
+    run = []
+    for step in kept + rest:
+        if step.kind == 'filter':
+            run.append(step)
+            continue
+        if len(run) > 0:
+            fused.append(_fuse(run))
+            run = []
+        fused.append(step)
+    if len(run) > 0:
+        fused.append(_fuse(run))
+
+    # walk back from the end to find the columns each step still needs from the frame it is given
+    needs = [None] * len(fused)
+    need = None
+    for i in reversed(range(len(fused))):
+        step = fused[i]
+        if step.kind == 'select':
+            need = set(step.cols)
+        elif step.cols is None and step.kind != 'label':
+            need = None
+        elif need is not None:
+            need = (need - set(step.adds or [])) | set(step.cols or []) | set(step.on or [])
+        needs[i] = need
+
+    return ((where, fused, needs))
+
+
+def _same(a, b):
+    # two (cols, where) requests that read the same thing
+    return (a[0] == b[0] and (a[1] is b[1] or (isinstance(a[1], dict) and a[1] == b[1])))
+
+
+def _covers(before, cols, where):
+    # a partition read with before = (cols, where) already holds every column and row of this request
+    before_cols, before_where = before
+    if before_cols is not None and (cols is None or not set(cols) <= set(before_cols)):
+        return (False)
+    if before_where is None:
+        return (True)
+    return (where is before_where or (isinstance(where, dict) and where == before_where))
+
+
+def _widen(before, cols, where):
+    # the request that reads a partition again with the columns and rows of both requests
+    before_cols, before_where = before
+    cols = None if before_cols is None or cols is None else sorted(set(before_cols) | set(cols))
+    if before_where is None or where is None:
+        return ((cols, None))
+    if before_where is _SOME_ROWS:
+        # the rows a transform kept cannot be read again, read the rows asked for now
+        if cols is not None and isinstance(where, dict):
+            cols = sorted(set(cols) | set(where))
+        return ((None if callable(where) else cols, where))
+    if where is before_where or (isinstance(where, dict) and where == before_where):
+        return ((cols, where))
+    if cols is not None:
+        if callable(where) or callable(before_where):
+            # the columns a function reads are not known
+            cols = None
+        else:
+            cols = sorted(set(cols) | set(where) | set(before_where))
+    return ((cols, lambda df: _mask(df, before_where) | _mask(df, where)))
+
+
+class Survey(object):
+    """
+    The extract and load engine shared by every survey class.
+
+    A subclass sets getter, the function that builds the url and survey id for a year (get_hd and friends),
+    and fall_offset, the number of years between the survey year and the fall it reports on.
+    """
+
+    getter = None
+    fall_offset = 0
+
+    def __init__(self, years=[2017], lazy=False, session=None):
+        """
         Parameters:
           years (list): List of ints for the survey year
+          lazy (bool): if True, extract and transform only build a plan, which is run in one pass by load or collect
+          session (Session): read the survey years through this registry, see registry.py.  Defaults to the
+                             session of the enclosing with block, if any
         """
 
         self.years = years
+        self.session = session
         self.df = pd.DataFrame()
+        # seconds spent on each download, parse and combine step, see extract
+        self.timings = []
+        # the (survey file, year) partitions already in df, with the cols and where they were read with,
+        # so extract only reads what is missing
+        self.loaded = {}
+        # the year columns of the rows that the cols of a transform left out, so extract can still tell the
+        # years apart
+        self.hidden = pd.DataFrame()
+        # in lazy mode, the extract calls and transform steps waiting for collect
+        self.lazy = lazy
+        self.pending = []
+        self.plan = []
 
-    def extract(self):
+    def _partition(self, year):
+        # a survey year is identified by its survey file id, for example (HD2017, 2017)
+        return ((self.getter(year)['survey'], year))
+
+    def keys(self):
+        """
+        Return the columns that identify a row across the extracted years, unitid, survey_year and the survey keys.
         """
-        Method to pull one or more IC surveys based on the configured object
 
-        The extract method currently supports back to 2002 and up to 2019.
+        fam = schemas.family(self.getter(int(self.years[0]))['survey']) if len(self.years) else None
+        extra = [k for k in schemas.KEYS.get(fam, ['unitid']) if k != 'unitid']
+        return (['unitid', 'survey_year'] + extra)
+
+    @classmethod
+    def survey_years(cls, fall_years):
         """
+        Return the survey years that report on the given fall years, for example SFA 2018 for fall 2017.
+
+        Parameters:
+            fall_years (list): List of ints for the fall years
+        """
+
+        return ([int(year) + cls.fall_offset for year in fall_years])
+
+    def _infos(self, year):
+        # every survey file needed for a year, prefetched together
+        return ([self.getter(year)])
+
+    def _read(self, year_info, year, fall_year, cols=None, where=None):
+        # through the session when there is one, so each survey year is parsed once for every survey object
+        from pypeds import registry
+        source = self.session if self.session is not None else registry.current()
+        if source is not None:
+            return (source.read_year(year_info, year, fall_year, cols=cols, where=where, timings=self.timings))
+        return (read_year(year_info, year, fall_year, cols=cols, where=where, timings=self.timings))
 
-        init_df = pd.DataFrame({'pypeds_init': [True]})
-        for year in self.years:
-            # assert that year is a int and length 1
-            # build the SURVEY id
-            SURVEY = 'HD' + str(year)
-            # build the url
-            URL = "https://nces.ed.gov/ipeds/datacenter/data/{}.zip".format(
-                SURVEY)
-            # return the bits as a dictionary for use later
-            year_info = {'url': URL, 'survey': SURVEY}
-            # year_info = get_efc(year)
-            year_fpath = zip_parser(
-                url=year_info['url'], survey=year_info['survey'])
-            tmp_df = read_survey(year_fpath)
-            tmp_df.columns = tmp_df.columns.str.lower()
-            tmp_df.columns = tmp_df.columns.str.strip()
-            tmp_df['survey_year'] = int(year)
-            tmp_df['fall_year'] = int(year)
-            init_df = pd.concat([init_df, tmp_df], ignore_index=True, sort=False)
-            # print("finished hd for year {}".format(str(year)))
-        # finish up
-        # ignore pandas SettingWithCopyWarning, basically
+    def _read_year(self, year, cols=None, where=None):
+        # one survey year, a subclass can join more files onto it
+        return (self._read(self.getter(year), year, year - self.fall_offset, cols=cols, where=where))
+
+    def extract_iter(self, cols=None, where=None, status=None, years=None):
+        """
+        Generator version of extract that yields one survey year at a time as a dataframe.
+        Nothing is kept on the object, so the years can be reduced as they arrive.
+
+        Parameters:
+            cols (list): only parse these columns, the survey's key columns are always kept.  Default None keeps all.
+            where (dict or function): keep only the matching rows while each year is parsed, see read_survey
+            status (bool): if True, print each year as it starts
+            years (list): the survey years to read, defaults to the years of the object
+        """
+
+        if years is None:
+            years = self.years
+        # start every download now, each year is parsed as soon as its zip is in
+        cache.prefetch([info for year in years for info in self._infos(int(year))])
+        for year in years:
+            # since we use numpy, convert to int
+            year = int(year)
+            if status:
+                print("Starting " + str(year))
+            yield (self._read_year(year, cols=cols, where=where))
+
+    def extract(self, cols=None, where=None, status=None, refresh=False):
+        """
+        Method to pull one or more years of the survey based on the configured object
+
+        The years are collected first and combined once at the end, the time spent on each step is
+        kept in the timings attribute.  Years already extracted are skipped, so adding a year to
+        years and calling extract again only reads the new year.  A year read earlier with fewer columns or
+        rows than asked for now is read again, with the columns and rows of both calls.  So is a year whose
+        columns or rows a transform dropped, with the columns left and the rows asked for now.  In lazy mode
+        nothing is read until collect.
+
+        Parameters:
+            cols (list): only parse these columns, the survey's key columns are always kept.  Default None keeps all.
+            where (dict or function): keep only the matching rows while each year is parsed, see read_survey
+            status (bool): if True, print each year as it starts
+            refresh (bool): if True, read every year again and replace the rows already extracted
+        """
+
+        if self.lazy:
+            self.pending.append({'cols': cols, 'where': where, 'status': status, 'refresh': refresh})
+            return
+        self._extract(cols=cols, where=where, status=status, refresh=refresh)
+
+    def _with_years(self):
+        # df with the year columns a transform left out put back, unless df was replaced by hand
+        if len(self.hidden.columns) > 0 and self.hidden.index.equals(self.df.index):
+            return (pd.concat([self.df, self.hidden], axis=1))
+        return (self.df)
+
+    def _extract(self, cols=None, where=None, status=None, refresh=False):
+        # a dataframe emptied or replaced by hand no longer holds what was loaded
+        df = self._with_years()
+        if df.empty or refresh or 'survey_year' not in df.columns:
+            self.loaded = {}
+
+        # the years not read yet, and the years read with fewer columns or rows than asked for now
+        reads = []
+        for year in [int(year) for year in self.years]:
+            before = self.loaded.get(self._partition(year))
+            if before is None:
+                request = (cols, where)
+            elif _covers(before, cols, where):
+                continue
+            else:
+                request = _widen(before, cols, where)
+            if len(reads) > 0 and _same(reads[-1][0], request):
+                reads[-1][1].append(year)
+            else:
+                reads.append((request, [year]))
+        if len(reads) == 0:
+            return
+
+        # ignore pandas SettingWithCopyWarning in the transforms, basically
         pd.options.mode.chained_assignment = None
-        init_df = init_df.loc[init_df.pypeds_init != True, ]
-        init_df.drop(columns=['pypeds_init'], inplace=True)
-        # return(init_df)
-        self.df = pd.concat([self.df, init_df], ignore_index=True)
+        frames = []
+        for (read_cols, read_where), years in reads:
+            frames += list(self.extract_iter(cols=read_cols, where=read_where, status=status, years=years))
+        started = time.perf_counter()
+        years = [year for _, group in reads for year in group]
+        if not df.empty and 'survey_year' in df.columns:
+            # the years read again replace their old rows
+            df = df.loc[~df.survey_year.isin(years)]
+        self.df = _accumulate([df] + frames)
+        keys = self.keys()
+        if not df.empty and all(k in self.df.columns for k in keys):
+            self.df = self.df.drop_duplicates(subset=keys, keep='last', ignore_index=True)
+        self.hidden = pd.DataFrame()
+        for request, group in reads:
+            for year in group:
+                self.loaded[self._partition(year)] = request
+        self.timings.append({'survey': type(self).__name__, 'year': None, 'step': 'combine',
+                             'seconds': time.perf_counter() - started})
+
+    def _transform(self, steps):
+        # run the steps of a transform call now, or keep them for collect in lazy mode
+        if self.lazy:
+            self.plan += steps
+        else:
+            self._apply(steps)
+
+    def _apply(self, steps, needs=None):
+        # run transform steps over df, and keep track of what they dropped
+        df = self._with_years()
+        out = _run(df, steps, needs)
+
+        # a year left with fewer columns or rows is read again by an extract that asks for them
+        dropped = set(df.columns) - set(out.columns)
+        if len(dropped) > 0 or len(out) < len(df):
+            for partition, (cols, where) in self.loaded.items():
+                cols = [c for c in (cols if cols is not None else df.columns) if c not in dropped]
+                self.loaded[partition] = (cols, _SOME_ROWS if len(out) < len(df) else where)
+
+        # the year columns stay with the rows, but are only shown if the last cols asked for them
+        selects = [step.arg for step in steps if step.kind == 'select']
+        if len(selects) > 0:
+            hide = [c for c in _YEARS if c in out.columns and c not in selects[-1]]
+        else:
+            hide = [c for c in self.hidden.columns if c in out.columns]
+        self.hidden = out[hide]
+        self.df = out.drop(columns=hide)
+
+    def collect(self):
+        """
+        Run the waiting extract and transform calls of a lazy survey in one pass, and return the dataframe.
+
+        The filters on survey columns are applied while the csv is parsed, or fused into a single mask,
+        only the columns the plan uses are parsed, and unused columns are dropped before each join.
+        """
+
+        where, steps, needs = _optimize(self.plan)
+        need = needs[0] if len(needs) > 0 else None
+        if need is not None:
+            need = need | set(where)
+
+        # as eagerly, a filter on a column that is not extracted is an error, not an empty result
+        available = set(self._with_years().columns) | set(self.keys()) | set(_YEARS)
+        for call in self.pending:
+            if call['cols'] is None:
+                available = None
+                break
+            available |= set(call['cols']) | set(call['where'] if isinstance(call['where'], dict) else [])
+        _missing(where, available)
+
+        # the filters that could not be handed to every extract call run on the dataframe instead
+        extra = {} if len(self.pending) > 0 else dict(where)
+        for call in self.pending:
+            call = dict(call)
+            # parse only the columns and rows the plan uses, but every column a where function might read
+            if need is not None and not callable(call['where']):
+                cols = call['cols'] if call['cols'] is not None else sorted(need)
+                call['cols'] = [c for c in cols if c in need]
+            if call['where'] is None or isinstance(call['where'], dict):
+                call['where'] = dict(call['where'] or {})
+                for col, value in where.items():
+                    if col in call['where'] and call['where'][col] != value:
+                        extra[col] = value
+                    else:
+                        call['where'][col] = value
+                if len(call['where']) == 0:
+                    call['where'] = None
+            else:
+                extra.update(where)
+            self._extract(**call)
+        _missing(where, self._with_years().columns)
+        if len(extra) > 0:
+            steps = [_filter(extra)] + steps
+            needs = [None] + needs
+
+        started = time.perf_counter()
+        self._apply(steps, needs)
+        self.timings.append({'survey': type(self).__name__, 'year': None, 'step': 'transform',
+                             'seconds': time.perf_counter() - started})
+        self.pending = []
+        self.plan = []
+        return (self.df)
 
-    # method to return the data
     def load(self):
         """
         The load method returns a pandas dataframe that has been extracted, and optionally, transformed.
+        A lazy survey runs its plan first, see collect.
         """
 
+        if self.lazy:
+            self.collect()
         return (self.df)
 
+
+# fall_year * _YEAR_KEY + unitid is a key that sorts by year and then unitid, for any unitid below _YEAR_KEY
+_YEAR_KEY = 10 ** 9
+
+
+def _year_key(fall_year, unitid):
+    # one int64 key per row that sorts by fall_year and then unitid
+    fall_year = np.asarray(fall_year, dtype='int64')
+    unitid = np.asarray(unitid, dtype='int64')
+    assert len(unitid) == 0 or (unitid.min() >= 0 and unitid.max() < _YEAR_KEY), \
+        'unitid out of range for the fall_year key, below {} expected'.format(_YEAR_KEY)
+    return (fall_year * _YEAR_KEY + unitid)
+
+
+def join(surveys, how='left', fall_years=None, session=None):
+    """
+    Join surveys with one row per institution on unitid and fall_year, the fall each survey year reports on,
+    so SFA 2018 lines up with HD 2017 without working out the offsets by hand.
+
+    The rows are those of the first survey, in its order, for a left join, and a merge of the sorted
+    (fall_year, unitid) keys otherwise, sorted on them.  Each survey is copied onto the rows once and all of
+    them are put side by side, instead of a chain of hash merges.  survey_year is
+    dropped, since it differs between the surveys, and a column found in more than one survey gets the lower
+    case class name of the later one as a suffix.
+
+    Parameters:
+        surveys (list): survey objects, survey classes or dataframes with unitid and fall_year.  A class is
+                        extracted for fall_years, a lazy survey is collected first
+        how (str): 'left' keeps the institutions of the first survey, 'inner' those in all of them, 'outer' any
+        fall_years (list): the fall years to extract for the survey classes in surveys
+        session (Session): read the survey classes through this registry, see registry.py
+    """
+
+    assert how in ['left', 'inner', 'outer'], "how must be 'left', 'inner' or 'outer'"
+    assert len(surveys) > 0, 'at least one survey is needed'
+
+    frames = []
+    names = []
+    for survey in surveys:
+        if isinstance(survey, type) and issubclass(survey, Survey):
+            assert fall_years is not None, 'fall_years is needed to extract a survey class'
+            survey = survey(years=survey.survey_years(fall_years), session=session)
+            survey.extract()
+        if isinstance(survey, Survey):
+            fam = schemas.family(survey.getter(int(survey.years[0]))['survey']) if len(survey.years) else None
+            assert schemas.KEYS.get(fam, ['unitid']) == ['unitid'], \
+                '{} has more than one row per institution, it cannot be joined'.format(type(survey).__name__)
+            names.append(type(survey).__name__.lower())
+            survey = survey.load()
+        else:
+            names.append('df{}'.format(len(frames)))
+        frames.append(survey)
+
+    # one int64 key per row that sorts by fall_year and then unitid
+    keys = []
+    for name, df in zip(names, frames):
+        key = pd.Index(_year_key(df['fall_year'].to_numpy(dtype='int64'), df['unitid'].to_numpy(dtype='int64')))
+        assert key.is_unique, 'the {} survey has more than one row for a unitid and fall_year'.format(name)
+        keys.append(key)
+
+    # the rows of the result, the first survey in its own order for a left join, otherwise a merge of the
+    # sorted keys.  Only the keys are sorted, never the surveys
+    index = keys[0]
+    if how != 'left':
+        index = index.sort_values()
+        for key in keys[1:]:
+            index = index.join(key.sort_values(), how=how)
+
+    # each survey is taken onto those rows in one copy, then they are put side by side
+    aligned = []
+    seen = set(['unitid', 'fall_year'])
+    for name, key, df in zip(names, keys, frames):
+        drop = [c for c in ['unitid', 'fall_year', 'survey_year'] if c in df.columns]
+        if key.equals(index):
+            # already in the order of the result, as the first survey usually is
+            df = df.drop(columns=drop).reset_index(drop=True)
+        else:
+            if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+                df = df.reset_index(drop=True)
+            df = df.reindex(key.get_indexer(index))
+            df.index = pd.RangeIndex(len(index))
+            for col in drop:
+                del df[col]
+        if len(aligned) > 0:
+            df = df.rename(columns={c: '{}_{}'.format(c, name) for c in df.columns if c in seen})
+        seen.update(df.columns)
+        aligned.append(df)
+    df = pd.concat(aligned, axis=1)
+    df.insert(0, 'unitid', (index.to_numpy() % _YEAR_KEY).astype('int32'))
+    df.insert(1, 'fall_year', index.to_numpy() // _YEAR_KEY)
+    return (df)
+
+
+def institution(unitid, surveys=None, years=[2017], cols=None):
+    """
+    Return everything the surveys have on one or a few institutions, as a dictionary with a dataframe for
+    each survey file family, for example HD, IC and ADM, with the rows of every fall year.
+
+    With the store enabled (see store.py), each survey year keeps an index of the rows of every unitid, so
+    only those rows are read and a profile comes back in milliseconds once the survey years are in the store.
+    Without it, each survey year is parsed with a unitid filter.
+
+    Parameters:
+        unitid (int or list): the unitid of the institution, or a list of them
+        surveys (list): the survey classes to read, defaults to all of them
+        years (list): the fall years to read, each survey class reads the survey year that reports on the fall
+        cols (list): only keep these columns, plus the survey's key columns.  Default None keeps all.
+    """
+
+    unitids = [int(u) for u in (unitid if isinstance(unitid, (list, tuple, set)) else [unitid])]
+    if surveys is None:
+        surveys = [HD, IC, SFA, EFC, ICAY, OM, EFD, FF1, FF2, C_A, CDEP]
+
+    # every survey file needed, downloaded together
+    reads = []
+    for cls in surveys:
+        assert isinstance(cls, type) and issubclass(cls, Survey), 'surveys must be survey classes, for example ipeds.HD'
+        for fall_year in years:
+            year = int(fall_year) + cls.fall_offset
+            for info in cls(years=[year])._infos(year):
+                reads.append((info, year, int(fall_year)))
+    cache.prefetch([info for info, _, _ in reads])
+
+    found = collections.OrderedDict()
+    for info, year, fall_year in reads:
+        fam = schemas.family(info['survey']) or info['survey']
+        keys = schemas.KEYS.get(fam, ['unitid'])
+        with cache.using([info['survey']]):
+            year_fpath = zip_parser(url=info['url'], survey=info['survey'])
+            part = _stored(info, year, fall_year, year_fpath) if store.enabled() else None
+            if isinstance(part, str):
+                df = store.lookup(part, unitids, cols=cols, keys=keys)
+            else:
+                df = read_year(info, year, fall_year, cols=cols, where={'unitid': unitids})
+        found.setdefault(fam, []).append(df)
+
+    return (collections.OrderedDict((fam, _concat(frames)) for fam, frames in found.items()))
+
+
+# the lookup tables and derived columns used in the transforms below
+
+def _hd_regions():
+    # state name and region for the fips code of the institution
+    r = datasets.region_xwalk()
+    r = r >> select(['fips', 'name', 'ipeds_region'])
+    return (r.rename(columns={"name": "state_name"}))
+
+
+def _efc_regions():
+    # state name, region and postal code for the state of residence in line
+    r = datasets.region_xwalk()
+    r = r >> select(['ipeds_code', 'name', 'ipeds_region', 'postal code'])
+    r = r.rename(columns={"ipeds_code": "line",
+                          "ipeds_region": "res_region",
+                          "postal code": "res_zip",
+                          "name": "res_name"})
+    r['line'] = r['line'].astype('Int16')
+    return (r)
+
+
+def _admit_rate(df):
+    df['admit_rate'] = df['admssn'] / df['applcn']
+    return (df)
+
+
+def _yield_rate(df):
+    df['yield_rate'] = df['enrlt'] / df['admssn']
+    return (df)
+
+
+class HD(Survey):
+    """
+    Directory Information from the Institutional Characteristics survey.
+    Currently supports the years 2002 - 2018.
+
+    Methods are extract, transform, and load.
+    """
+
+    getter = staticmethod(get_hd)
+    fall_offset = 0
+
+    def __init__(self, years=[2017], lazy=False, session=None):
+        """
+        The constructor for the HD survey
+
+        Parameters:
+          years (list): List of ints for the survey year
+          lazy (bool): if True, build a plan that load runs in one pass, see Survey.collect
+          session (Session): share parsed survey years through this registry, see registry.py
+        """
+
+        super().__init__(years=years, lazy=lazy, session=session)
+
     def transform(self,
                   deg4yr=None,
                   service=None,
@@ -293,125 +1253,75 @@ class HD(object):
             cols (list): A list of valid column names to keep, all others will be excluded
         """
 
-        tmpdf = self.df
+        steps = []
 
         # degree granting non profit private 4yr and public 4 yr
         if deg4yr:
-            tmp = tmpdf
-            tmp_f = tmp.loc[(tmp.sector.isin([1, 2])) & (
-                tmp.pset4flg == 1) & (tmp.deggrant == 1), ]
-            tmpdf = tmp_f
+            steps.append(_filter({'sector': [1, 2], 'pset4flg': 1, 'deggrant': 1}))
 
         # remove service schools
         if service:
-            tmp = tmpdf
-            tmp_f = tmp.loc[tmp.obereg != 0, ]
-            tmpdf = tmp_f
+            steps.append(_filter(lambda df: df.obereg != 0, cols=['obereg']))
 
-        # lower 48 states with DC
+        # lower 48 states with DC, the state fips codes run to 56, less alaska (2) and hawaii (15)
         if lower_us:
-            tmp = tmpdf
-            tmp_f = tmp.loc[tmp.fips <= 51, ]
-            tmp_f = tmp.loc[tmp.fips != 2, ]
-            tmp_f = tmp.loc[tmp.fips != 12, ]
-            tmpdf = tmp_f
+            steps.append(_filter(lambda df: (df.fips <= 56) & ~df.fips.isin([2, 15]), cols=['fips']))
 
         # add the regions info
         if regions:
-            r = datasets.region_xwalk()
-            r = r >> select(['fips', 'name', 'ipeds_region'])
-            r = r.rename(columns={"name": "state_name"})
-            tmp = tmpdf
-            tmp_f = pd.merge(left=tmp, right=r, on="fips", how="left")
-            tmpdf = tmp_f
+            steps.append(_label(_hd_regions, on='fips'))
 
         # select columns
         if cols is not None:
             assert isinstance(cols, list), 'the argument cols must be a list'
             if len(cols) > 0:
-                tmp = tmpdf
-                tmp_f = tmp >> select(cols)
-                tmpdf = tmp_f
+                steps.append(_select(cols))
 
-        # return the data
-        self.df = tmpdf
+        # run the steps now, or add them to the plan of a lazy survey
+        self._transform(steps)
 
 
-class IC(object):
+class IC(Survey):
     """
     Educational offerings, organization, services and athletic associations from the Institutional Characteristics survey.
     Currently support the years 2002 to 2018.
+
+    Accounts for the application data being broken out of the IC survey starting in 2014, in which the
+    survey prefix is ADM.
     """
 
+    getter = staticmethod(get_ic)
+    fall_offset = 0
+
     # init
-    def __init__(self, years=[2018]):
+    def __init__(self, years=[2018], lazy=False, session=None):
         """
         The constructor for the IC survey
 
         Parameters:
           years (list): List of ints for the survey year
+          lazy (bool): if True, build a plan that load runs in one pass, see Survey.collect
+          session (Session): share parsed survey years through this registry, see registry.py
         """
 
-        self.years = years
-        self.df = pd.DataFrame()
-
-    # method to get the data and return a dataframe
-    def extract(self):
-        """
-        Method to pull one or more IC surveys based on the configured object
-
-        The extract method currently supports back to 2002 and accounts for the application data being broken
-        out of the IC survey starting in 2014, in which the survey prefix is ADM.
-        """
+        super().__init__(years=years, lazy=lazy, session=session)
 
-        ic_df = pd.DataFrame({'pypeds_init': [True]})
-        adm_df = pd.DataFrame({'pypeds_init': [True]})
-        # loop for ic and conditional check for adm
-        for year in self.years:
-            # the original dataset
-            year_info = get_ic(year)
-            year_fpath = zip_parser(
-                url=year_info['url'], survey=year_info['survey'])
-            tmp_df = read_survey(year_fpath)
-            tmp_df.columns = tmp_df.columns.str.lower()
-            tmp_df.columns = tmp_df.columns.str.strip()
-            tmp_df['survey_year'] = int(year)
-            tmp_df['fall_year'] = int(year)
-            ic_df = pd.concat([ic_df, tmp_df], axis=0, ignore_index=True, sort=False)
-            # check the year to get the admission data for 2014 and later
-            # this is in addition to above
-            if year >= 2014:
-                year_info = get_adm(year)
-                year_fpath = zip_parser(
-                    url=year_info['url'], survey=year_info['survey'])
-                tmp_df = read_survey(year_fpath)
-                tmp_df.columns = tmp_df.columns.str.lower()
-                tmp_df['survey_year'] = int(year)
-                tmp_df['fall_year'] = int(year)
-                adm_df = pd.concat([adm_df, tmp_df], axis=0, ignore_index=True, sort=False)
-
-        # finish up
-        # ignore pandas SettingWithCopyWarning,
-        pd.options.mode.chained_assignment = None
-        ic_df_final = ic_df.loc[ic_df.pypeds_init != True, ]
-        ic_df_final.drop(columns=['pypeds_init'], inplace=True)
-        adm_df_final = adm_df.loc[adm_df.pypeds_init != True, ]
-        adm_df_final.drop(columns=['pypeds_init'], inplace=True)
-        # df = pd.merge(ic_df_final, adm_df_final,
-        #               how="left",
-        #               on=['unitid', 'survey_year'],
-        #               suffixes=('_ic', '_adm'))
-        df = pd.merge(ic_df_final, adm_df_final,
-                      how="left",
-                      on=['unitid', 'survey_year', 'fall_year'])
-        self.df = pd.concat([self.df, df], axis=0, ignore_index=True)
+    def _infos(self, year):
+        # check the year to get the admission data for 2014 and later
+        if year >= 2014:
+            return ([get_ic(year), get_adm(year)])
+        return ([get_ic(year)])
 
-    def load(self):
-        """
-        The load method returns a pandas dataframe that has been extracted, and optionally, transformed.
-        """
-
-        return (self.df)
+    def _read_year(self, year, cols=None, where=None):
+        # the original dataset
+        df = super()._read_year(year, cols=cols, where=where)
+        # this is in addition to above, where is applied through the left join
+        if year >= 2014:
+            adm_df = self._read(get_adm(year), year, year, cols=cols)
+            df = pd.merge(df, adm_df,
+                          how="left",
+                          on=['unitid', 'survey_year', 'fall_year'])
+        return (df)
 
     def transform(self, admit_rate=True, yield_rate=True, app_data=None, cols=None):
         """
@@ -425,92 +1335,64 @@ class IC(object):
             cols (list): A list of valid column names to keep, all others will be excluded
         """
 
-        tmpdf = self.df
+        steps = []
 
         # calc admit rate
         if admit_rate:
-            tmp = tmpdf
-            tmp['admit_rate'] = tmp['admssn'] / tmp['applcn']
-            tmpdf = tmp
+            steps.append(_mutate(_admit_rate, cols=['admssn', 'applcn'], adds=['admit_rate']))
 
         # calc yield rate
         if yield_rate:
-            tmp = tmpdf
-            tmp['yield_rate'] = tmp['enrlt'] / tmp['admssn']
-            tmpdf = tmp
+            steps.append(_mutate(_yield_rate, cols=['enrlt', 'admssn'], adds=['yield_rate']))
 
         # keep those with adm survey data not missing
         if app_data:
-            tmp = tmpdf
-            tmp_f = tmp.dropna(subset=['applcn'], inplace=False)
-            tmpdf = tmp_f
+            steps.append(_filter(lambda df: df.applcn.notna(), cols=['applcn']))
 
         # select columns
         if cols is not None:
             assert isinstance(cols, list), 'cols must be a list'
             if len(cols) > 0:
-                tmp = tmpdf
-                tmp_f = tmp >> select(cols)
-                tmpdf = tmp_f
+                steps.append(_select(cols))
 
-        # return the data
-        self.df = tmpdf
+        # run the steps now, or add them to the plan of a lazy survey
+        self._transform(steps)
 
 
-class SFA(object):
+class SFA(Survey):
     """
     Student financial aid and net price from the Student Financial Aid and Net Price survey.
     """
 
-    def __init__(self, years=[2017]):
+    getter = staticmethod(get_sfa)
+    fall_offset = 1
+
+    def __init__(self, years=[2017], lazy=False, session=None):
         """
         The constructor for the SFA survey
 
         Parameters:
           years (list): List of ints for the survey year
+          lazy (bool): if True, build a plan that load runs in one pass, see Survey.collect
+          session (Session): share parsed survey years through this registry, see registry.py
         """
 
-        self.years = years
-        self.df = pd.DataFrame()
+        super().__init__(years=years, lazy=lazy, session=session)
 
-    def extract(self, status=None):
+    def extract(self, status=None, cols=None, where=None, refresh=False):
         """
         Method to pull one or more SFA surveys based on the configured object
 
         The extract method currently supports back to 2002
-        """
 
-        init_df = pd.DataFrame({'pypeds_init': [True]})
-        for year in self.years:
-            # since we use numpy, convert to int
-            year = int(year)
-            if status:
-                print("Starting " + str(year))
-            year_info = get_sfa(year)
-            year_fpath = zip_parser(
-                url=year_info['url'], survey=year_info['survey'])
-            tmp_df = read_survey(year_fpath)
-            tmp_df.columns = tmp_df.columns.str.lower()
-            tmp_df.columns = tmp_df.columns.str.strip()
-            tmp_df['survey_year'] = int(year)
-            tmp_df['fall_year'] = int(year) - 1
-            init_df = pd.concat([init_df, tmp_df], axis=0, ignore_index=True, sort=False)
-            # print("finished hd for year {}".format(str(year)))
-        # finish up
-        # ignore pandas SettingWithCopyWarning, basically
-        pd.options.mode.chained_assignment = None
-        init_df = init_df.loc[init_df.pypeds_init != True, ]
-        init_df.drop(columns=['pypeds_init'], inplace=True)
-        # return(init_df)
-        self.df = pd.concat([self.df, init_df], axis=0, ignore_index=True)
-
-        # method to return the data
-    def load(self):
-        """
-        The load method returns a pandas dataframe that has been extracted, and optionally, transformed.
+        Parameters:
+            status (bool): if True, print each year as it starts
+            cols (list): only parse these columns, the survey's key columns are always kept.  Default None keeps all.
+            where (dict or function): keep only the matching rows while each year is parsed, see read_survey
+            refresh (bool): if True, read every year again and replace the rows already extracted
         """
 
-        return (self.df)
+        super().extract(cols=cols, where=where, status=status, refresh=refresh)
 
     def transform(self, cols=None):
         """
@@ -521,7 +1403,7 @@ class SFA(object):
             cols (list): A list of valid column names to keep, all others will be excluded
         """
 
-        tmpdf = self.df
+        steps = []
 
         # select columns
         # TODO: conditionally check for net price columns
@@ -529,60 +1411,31 @@ class SFA(object):
         if cols is not None:
             assert isinstance(cols, list), 'cols must be a list'
             if len(cols) > 0:
-                tmp = tmpdf
-                tmp_f = tmp >> select(cols)
-                tmpdf = tmp_f
+                steps.append(_select(cols))
 
-        # return the data
-        self.df = tmpdf
+        # run the steps now, or add them to the plan of a lazy survey
+        self._transform(steps)
 
 
-class EFC(object):
+class EFC(Survey):
     """
     Residence and migration of first-time freshman from the Fall Enrollment survey.
     """
 
-    def __init__(self, years=[2017]):
+    getter = staticmethod(get_efc)
+    fall_offset = 0
+
+    def __init__(self, years=[2017], lazy=False, session=None):
         """
         The constructor for the EF_C survey
 
         Parameters:
           years (list): List of ints for the survey year
+          lazy (bool): if True, build a plan that load runs in one pass, see Survey.collect
+          session (Session): share parsed survey years through this registry, see registry.py
         """
 
-        self.years = years
-        self.df = pd.DataFrame()
-
-    def extract(self):
-        """
-        Method to pull one or more EF_C surveys based on the configured object
-        """
-
-        init_df = pd.DataFrame({'pypeds_init': [True]})
-        for year in self.years:
-            year_info = get_efc(year)
-            year_fpath = zip_parser(
-                url=year_info['url'], survey=year_info['survey'])
-            tmp_df = read_survey(year_fpath)
-            tmp_df.columns = tmp_df.columns.str.lower()
-            tmp_df.columns = tmp_df.columns.str.strip()
-            tmp_df['survey_year'] = int(year)
-            tmp_df['fall_year'] = int(year)
-            init_df = pd.concat([init_df, tmp_df], axis=0, ignore_index=True, sort=False)
-        # finish up
-        # ignore pandas SettingWithCopyWarning, basically
-        pd.options.mode.chained_assignment = None
-        init_df = init_df.loc[init_df.pypeds_init != True, ]
-        init_df.drop(columns=['pypeds_init'], inplace=True)
-        # return(init_df)
-        self.df = pd.concat([self.df, init_df], axis=0, ignore_index=True)
-
-    def load(self):
-        """
-        The load method returns a pandas dataframe that has been extracted, and optionally, transformed.
-        """
-
-        return (self.df)
+        super().__init__(years=years, lazy=lazy, session=session)
 
     def transform(self, state=None, line=None, cols=None, regions=None):
         """
@@ -595,96 +1448,53 @@ class EFC(object):
             cols (list): a list of the columns to be kept, column names in quotes
         """
 
-        tmpdf = self.df
+        steps = []
 
         # filter rows by efcstate
         if state is not None:
             assert isinstance(state, list), 'state must a list'
             if len(state) > 0:
-                tmp = tmpdf
-                tmp_f = tmp.loc[tmp.efcstate.isin(state)]
-                tmpdf = tmp_f
+                steps.append(_filter({'efcstate': state}))
 
         # filter rows by line
         if line is not None:
             assert isinstance(line, list), 'line must a list'
             if len(line) > 0:
-                tmp = tmpdf
-                tmp_f = tmp.loc[tmp.line.isin(line)]
-                tmpdf = tmp_f
+                steps.append(_filter({'line': line}))
 
         # select columns
         if cols is not None:
             assert isinstance(cols, list), 'cols must be a list'
             if len(cols) > 0:
-                tmp = tmpdf
-                tmp_f = tmp >> select(cols)
-                tmpdf = tmp_f
+                steps.append(_select(cols))
 
         # add the regions info
         if regions:
-            r = datasets.region_xwalk()
-            r = r >> select(
-                ['ipeds_code', 'name', 'ipeds_region', 'postal code'])
-            r = r.rename(columns={"ipeds_code": "line",
-                                  "ipeds_region": "res_region",
-                                  "postal code": "res_zip",
-                                  "name": "res_name"})
-            r['line'] = r['line'].astype('float64')
-            tmp = tmpdf
-            tmp_f = pd.merge(left=tmp, right=r, on="line", how="left")
-            tmpdf = tmp_f
-
-        # return the data
-        self.df = tmpdf
-
-
-class ICAY(object):
+            steps.append(_label(_efc_regions, on='line'))
+
+        # run the steps now, or add them to the plan of a lazy survey
+        self._transform(steps)
+
+
+class ICAY(Survey):
     """
     Student charges for academic year programs from the Institutional Characteristics survey.
     """
 
-    def __init__(self, years=[2017]):
+    getter = staticmethod(get_icay)
+    fall_offset = 0
+
+    def __init__(self, years=[2017], lazy=False, session=None):
         """
         The constructor for the IC_AY survey
 
         Parameters:
           years (list): List of ints for the survey year
+          lazy (bool): if True, build a plan that load runs in one pass, see Survey.collect
+          session (Session): share parsed survey years through this registry, see registry.py
         """
 
-        self.years = years
-        self.df = pd.DataFrame()
-
-    def extract(self):
-        """
-        Method to pull one or more IC_AY surveys based on the configured object
-        """
-
-        init_df = pd.DataFrame({'pypeds_init': [True]})
-        for year in self.years:
-            year_info = get_icay(year)
-            year_fpath = zip_parser(
-                url=year_info['url'], survey=year_info['survey'])
-            tmp_df = read_survey(year_fpath)
-            tmp_df.columns = tmp_df.columns.str.lower()
-            tmp_df.columns = tmp_df.columns.str.strip()
-            tmp_df['survey_year'] = int(year)
-            tmp_df['fall_year'] = int(year)
-            init_df = pd.concat([init_df, tmp_df], axis=0, ignore_index=True, sort=False)
-        # finish up
-        # ignore pandas SettingWithCopyWarning, basically
-        pd.options.mode.chained_assignment = None
-        init_df = init_df.loc[init_df.pypeds_init != True, ]
-        init_df.drop(columns=['pypeds_init'], inplace=True)
-        # return(init_df)
-        self.df = pd.concat([self.df, init_df], axis=0, ignore_index=True)
-
-    def load(self):
-        """
-        The load method returns a pandas dataframe that has been extracted, and optionally, transformed.
-        """
-
-        return (self.df)
+        super().__init__(years=years, lazy=lazy, session=session)
 
     def transform(self, cols=None):
         """
@@ -695,163 +1505,79 @@ class ICAY(object):
             cols (list): a list of the columsn to be kept, column names in quotes
         """
 
-        tmpdf = self.df
+        steps = []
 
         # filter the columns
         if cols is not None:
             assert isinstance(cols, list), 'cols must be a list'
             if len(cols) > 0:
-                tmp = tmpdf
-                tmp_f = tmp >> select(cols)
-                tmpdf = tmp_f
+                steps.append(_select(cols))
 
-        # return the dataset
-        self.df = tmpdf
+        # run the steps now, or add them to the plan of a lazy survey
+        self._transform(steps)
 
 
-class OM(object):
+class OM(Survey):
     """
     Award and enrollment data at four, six and eight years of entering degree/certificate-seeking undergraduate cohorts at degree-granting institutions, by Pell status
     """
 
-    def __init__(self, years=[2017]):
+    getter = staticmethod(get_om)
+    fall_offset = 8
+
+    def __init__(self, years=[2017], lazy=False, session=None):
         """
         The constructor for the IC_AY survey
 
         Parameters:
           years (list): List of ints for the survey year
+          lazy (bool): if True, build a plan that load runs in one pass, see Survey.collect
+          session (Session): share parsed survey years through this registry, see registry.py
         """
 
-        self.years = years
-        self.df = pd.DataFrame()
+        super().__init__(years=years, lazy=lazy, session=session)
 
-    def extract(self):
-        """
-        Method to pull one or more IC_AY surveys based on the configured object
-        """
-
-        init_df = pd.DataFrame({'pypeds_init': [True]})
-        for year in self.years:
-            year_info = get_om(year)
-            year_fpath = zip_parser(
-                url=year_info['url'], survey=year_info['survey'])
-            tmp_df = read_survey(year_fpath)
-            tmp_df.columns = tmp_df.columns.str.lower()
-            tmp_df.columns = tmp_df.columns.str.strip()
-            tmp_df['survey_year'] = int(year)
-            tmp_df['fall_year'] = int(year) - 8
-            init_df = pd.concat([init_df, tmp_df], axis=0, ignore_index=True, sort=False)
-        # finish up
-        # ignore pandas SettingWithCopyWarning, basically
-        pd.options.mode.chained_assignment = None
-        init_df = init_df.loc[init_df.pypeds_init != True, ]
-        init_df.drop(columns=['pypeds_init'], inplace=True)
-        # return(init_df)
-        self.df = pd.concat([self.df, init_df], axis=0, ignore_index=True)
 
-    def load(self):
-        """
-        The load method returns a pandas dataframe that has been extracted, and optionally, transformed.
-        """
-
-        return (self.df)
-
-
-class EFD(object):
+class EFD(Survey):
     """
     Total entering class, retention rates, and student-to-faculty ratio
     """
 
-    def __init__(self, years=[2017]):
+    getter = staticmethod(get_efd)
+    fall_offset = 0
+
+    def __init__(self, years=[2017], lazy=False, session=None):
         """
         The constructor for the IC_AY survey
 
         Parameters:
           years (list): List of ints for the survey year
+          lazy (bool): if True, build a plan that load runs in one pass, see Survey.collect
+          session (Session): share parsed survey years through this registry, see registry.py
         """
 
-        self.years = years
-        self.df = pd.DataFrame()
-
-    def extract(self):
-        """
-        Method to pull one or more IC_AY surveys based on the configured object
-        """
-
-        init_df = pd.DataFrame({'pypeds_init': [True]})
-        for year in self.years:
-            year_info = get_efd(year)
-            year_fpath = zip_parser(
-                url=year_info['url'], survey=year_info['survey'])
-            tmp_df = read_survey(year_fpath)
-            tmp_df.columns = tmp_df.columns.str.lower()
-            tmp_df.columns = tmp_df.columns.str.strip()
-            tmp_df['survey_year'] = int(year)
-            tmp_df['fall_year'] = int(year)
-            init_df = pd.concat([init_df, tmp_df], axis=0, ignore_index=True, sort=False)
-        # finish up
-        # ignore pandas SettingWithCopyWarning, basically
-        pd.options.mode.chained_assignment = None
-        init_df = init_df.loc[init_df.pypeds_init != True, ]
-        init_df.drop(columns=['pypeds_init'], inplace=True)
-        # return(init_df)
-        self.df = pd.concat([self.df, init_df], axis=0, ignore_index=True)
-
-    def load(self):
-        """
-        The load method returns a pandas dataframe that has been extracted, and optionally, transformed.
-        """
-
-        return (self.df)
+        super().__init__(years=years, lazy=lazy, session=session)
 
 
-class FF1(object):
+class FF1(Survey):
     """
     Private not-for-profit institutions or Public institutions using FASB:
     """
 
-    def __init__(self, years=[2018]):
+    getter = staticmethod(get_ff1)
+    fall_offset = 1
+
+    def __init__(self, years=[2018], lazy=False, session=None):
         """
         Public institutions - GASB
 
         Parameters:
           years (list): List of ints for the survey year
+          lazy (bool): if True, build a plan that load runs in one pass, see Survey.collect
+          session (Session): share parsed survey years through this registry, see registry.py
         """
 
-        self.years = years
-        self.df = pd.DataFrame()
-
-    def extract(self):
-        """
-        Method to pull one or more IC_AY surveys based on the configured object
-        """
-
-        init_df = pd.DataFrame({'pypeds_init': [True]})
-        for year in self.years:
-            year = int(year)
-            year_info = get_ff1(year)
-            year_fpath = zip_parser(
-                url=year_info['url'], survey=year_info['survey'])
-            tmp_df = read_survey(year_fpath)
-            tmp_df.columns = tmp_df.columns.str.lower()
-            tmp_df.columns = tmp_df.columns.str.strip()
-            tmp_df['survey_year'] = int(year)
-            tmp_df['fall_year'] = int(year) - 1
-            init_df = pd.concat([init_df, tmp_df], axis=0, ignore_index=True, sort=False)
-        # finish up
-        # ignore pandas SettingWithCopyWarning, basically
-        pd.options.mode.chained_assignment = None
-        init_df = init_df.loc[init_df.pypeds_init != True, ]
-        init_df.drop(columns=['pypeds_init'], inplace=True)
-        # return(init_df)
-        self.df = pd.concat([self.df, init_df], axis=0, ignore_index=True)
-
-    def load(self):
-        """
-        The load method returns a pandas dataframe that has been extracted, and optionally, transformed.
-        """
-
-        return (self.df)
+        super().__init__(years=years, lazy=lazy, session=session)
 
     def transform(self, cols=None):
         """
@@ -862,67 +1588,37 @@ class FF1(object):
             cols (list): a list of the columsn to be kept, column names in quotes
         """
 
-        tmpdf = self.df
+        steps = []
 
         # filter the columns
         if cols is not None:
             assert isinstance(cols, list), 'cols must be a list'
             if len(cols) > 0:
-                tmp = tmpdf
-                tmp_f = tmp >> select(cols)
-                tmpdf = tmp_f
+                steps.append(_select(cols))
 
-        # return the dataset
-        self.df = tmpdf
+        # run the steps now, or add them to the plan of a lazy survey
+        self._transform(steps)
 
 
-class FF2(object):
+class FF2(Survey):
     """
     Private not-for-profit institutions or Public institutions using FASB:
     """
 
-    def __init__(self, years=[2018]):
+    getter = staticmethod(get_ff2)
+    fall_offset = 1
+
+    def __init__(self, years=[2018], lazy=False, session=None):
         """
         Public institutions - GASB
 
         Parameters:
           years (list): List of ints for the survey year
+          lazy (bool): if True, build a plan that load runs in one pass, see Survey.collect
+          session (Session): share parsed survey years through this registry, see registry.py
         """
 
-        self.years = years
-        self.df = pd.DataFrame()
-
-    def extract(self):
-        """
-        Method to pull one or more IC_AY surveys based on the configured object
-        """
-
-        init_df = pd.DataFrame({'pypeds_init': [True]})
-        for year in self.years:
-            year = int(year)
-            year_info = get_ff2(year)
-            year_fpath = zip_parser(
-                url=year_info['url'], survey=year_info['survey'])
-            tmp_df = read_survey(year_fpath)
-            tmp_df.columns = tmp_df.columns.str.lower()
-            tmp_df.columns = tmp_df.columns.str.strip()
-            tmp_df['survey_year'] = int(year)
-            tmp_df['fall_year'] = int(year) - 1
-            init_df = pd.concat([init_df, tmp_df], axis=0, ignore_index=True, sort=False)
-        # finish up
-        # ignore pandas SettingWithCopyWarning, basically
-        pd.options.mode.chained_assignment = None
-        init_df = init_df.loc[init_df.pypeds_init != True, ]
-        init_df.drop(columns=['pypeds_init'], inplace=True)
-        # return(init_df)
-        self.df = pd.concat([self.df, init_df], axis=0, ignore_index=True)
-
-    def load(self):
-        """
-        The load method returns a pandas dataframe that has been extracted, and optionally, transformed.
-        """
-
-        return (self.df)
+        super().__init__(years=years, lazy=lazy, session=session)
 
     def transform(self, cols=None):
         """
@@ -933,68 +1629,37 @@ class FF2(object):
             cols (list): a list of the columsn to be kept, column names in quotes
         """
 
-        tmpdf = self.df
+        steps = []
 
         # filter the columns
         if cols is not None:
             assert isinstance(cols, list), 'cols must be a list'
             if len(cols) > 0:
-                tmp = tmpdf
-                tmp_f = tmp >> select(cols)
-                tmpdf = tmp_f
+                steps.append(_select(cols))
 
-        # return the dataset
-        self.df = tmpdf
+        # run the steps now, or add them to the plan of a lazy survey
+        self._transform(steps)
 
 
-class C_A(object):
+class C_A(Survey):
     """
     Awards/degrees conferred by program (6-digit CIP code), award level, race/ethnicity, and gender
     """
 
-    def __init__(self, years=[2020]):
+    getter = staticmethod(get_ca)
+    fall_offset = 1
+
+    def __init__(self, years=[2020], lazy=False, session=None):
         """
         Public institutions - GASB
 
         Parameters:
           years (list): List of ints for the survey year
+          lazy (bool): if True, build a plan that load runs in one pass, see Survey.collect
+          session (Session): share parsed survey years through this registry, see registry.py
         """
 
-        self.years = years
-        self.df = pd.DataFrame()
-
-    def extract(self):
-        """
-        Method to pull one or more IC_AY surveys based on the configured object
-        """
-
-        init_df = pd.DataFrame({'pypeds_init': [True]})
-        for year in self.years:
-            year = int(year)
-            year_info = get_ca(year)
-            year_fpath = zip_parser(
-                url=year_info['url'], survey=year_info['survey'])
-            tmp_df = read_survey(year_fpath)
-            tmp_df.columns = tmp_df.columns.str.lower()
-            tmp_df.columns = tmp_df.columns.str.strip()
-            tmp_df['survey_year'] = int(year)
-            tmp_df['fall_year'] = int(year) - 1
-            init_df = pd.concat([init_df, tmp_df],
-                                ignore_index=True, sort=False)
-        # finish up
-        # ignore pandas SettingWithCopyWarning, basically
-        pd.options.mode.chained_assignment = None
-        init_df = init_df.loc[init_df.pypeds_init != True, ]
-        init_df.drop(columns=['pypeds_init'], inplace=True)
-        # return(init_df)
-        self.df = pd.concat([self.df, init_df], ignore_index=True)
-
-    def load(self):
-        """
-        The load method returns a pandas dataframe that has been extracted, and optionally, transformed.
-        """
-
-        return (self.df)
+        super().__init__(years=years, lazy=lazy, session=session)
 
     def transform(self,
                   cip_label=True,
@@ -1016,101 +1681,72 @@ class C_A(object):
             cols (list): a list of the columns to be kept, column names in quotes
         """
 
-        tmpdf = self.df
+        steps = []
 
         # add the CIP code labels
         if cip_label:
-            # get the cip code crosswalk
-            cips = datasets.cipcodes()
-            # add the cip codes
-            tmp = tmpdf
-            tmp = pd.merge(left=tmp, right=cips, on="cipcode", how="left")
-            # set the update
-            tmpdf = tmp
+            steps.append(_label(datasets.cipcodes, on='cipcode'))
 
         # add the award level labels
         if award_level:
-            # get the award level labels
-            al = datasets.award_levels()
-            # add the labels onto the dataframe
-            tmp = tmpdf
-            tmp = pd.merge(left=tmp, right=al, on="awlevel", how="left")
-            # set the update
-            tmpdf = tmp
+            steps.append(_label(datasets.award_levels, on='awlevel'))
 
         # keep only the first major
         if first_major:
-            tmp = tmpdf
-            tmp = tmp.loc[tmp.majornum == 1, ]
-            # set the update
-            tmpdf = tmp
+            steps.append(_filter({'majornum': 1}))
 
         # the award levels to keep
         if level_keep is not None:
             assert isinstance(level_keep, list), 'level_keep must be a list'
             if len(level_keep) > 0:
-                tmp = tmpdf
-                tmp = tmp.loc[tmp.awlevel.isin(level_keep), ]
-                # set the update
-                tmpdf = tmp
+                steps.append(_filter({'awlevel': level_keep}))
 
         # filter the columns
         if cols is not None:
             assert isinstance(cols, list), 'cols must be a list'
             if len(cols) > 0:
-                tmp = tmpdf
-                tmp_f = tmp >> select(cols)
-                tmpdf = tmp_f
+                steps.append(_select(cols))
 
-        # return the dataset
-        self.df = tmpdf
+        # run the steps now, or add them to the plan of a lazy survey
+        self._transform(steps)
 
-
-class CDEP(object):
-    """
-    Number of programs offered and number of programs offered via distance education, by award level 
-    """
-
-    def __init__(self, years=[2020]):
+    def to_sparse_matrix(self, level=None, cip_digits=6, value='ctotalt', fall_year=None):
         """
+        Return the completions as a sparse institution x CIP matrix, a programs.ProgramMix with the scipy CSR
+        matrix, the unitid of each row and the CIP code of each column.  See programs.py to roll it up and
+        compare the program mix of institutions.
+
         Parameters:
-          years (list): List of ints for the survey year
+            level (list): only count these award levels, None for all of them
+            cip_digits (int): 2 or 4 to add the programs up to their CIP family or series, 6 keeps them
+            value (str): the column counted, ctotalt for all completions
+            fall_year (int): the fall to use when more than one was extracted
         """
 
-        self.years = years
-        self.df = pd.DataFrame()
+        from pypeds import programs
+        df = self.load()
+        if fall_year is not None:
+            df = df.loc[df.fall_year == fall_year]
+        return (programs.build(df, level=level, cip_digits=cip_digits, value=value))
 
-    def extract(self):
-        """
-        Method to pull one or more CDEP surveys based on the configured object
-        """
 
-        init_df = pd.DataFrame({'pypeds_init': [True]})
-        for year in self.years:
-            year = int(year)
-            year_info = get_cdep(year)
-            year_fpath = zip_parser(
-                url=year_info['url'], survey=year_info['survey'])
-            tmp_df = read_survey(year_fpath)
-            tmp_df.columns = tmp_df.columns.str.lower()
-            tmp_df.columns = tmp_df.columns.str.strip()
-            tmp_df['survey_year'] = int(year)
-            tmp_df['fall_year'] = int(year) - 1
-            init_df = pd.concat([init_df, tmp_df], axis=0, ignore_index=True, sort=False)
-        # finish up
-        # ignore pandas SettingWithCopyWarning, basically
-        pd.options.mode.chained_assignment = None
-        init_df = init_df.loc[init_df.pypeds_init != True, ]
-        init_df.drop(columns=['pypeds_init'], inplace=True)
-        # return(init_df)
-        self.df = pd.concat([self.df, init_df], axis=0, ignore_index=True)
+class CDEP(Survey):
+    """
+    Number of programs offered and number of programs offered via distance education, by award level 
+    """
 
-    def load(self):
+    getter = staticmethod(get_cdep)
+    fall_offset = 1
+
+    def __init__(self, years=[2020], lazy=False, session=None):
         """
-        The load method returns a pandas dataframe that has been extracted, and optionally, transformed.
+        Parameters:
+          years (list): List of ints for the survey year
+          lazy (bool): if True, build a plan that load runs in one pass, see Survey.collect
+          session (Session): share parsed survey years through this registry, see registry.py
         """
 
-        return (self.df)
+        super().__init__(years=years, lazy=lazy, session=session)
 
     def transform(self,
                   cip_label=True,
@@ -1132,51 +1768,31 @@ class CDEP(object):
             cols (list): a list of the columns to be kept, column names in quotes
         """
 
-        tmpdf = self.df
+        steps = []
 
         # add the CIP code labels
         if cip_label:
-            # get the cip code crosswalk
-            cips = datasets.cipcodes()
-            # add the cip codes
-            tmp = tmpdf
-            tmp = pd.merge(left=tmp, right=cips, on="cipcode", how="left")
-            # set the update
-            tmpdf = tmp
+            steps.append(_label(datasets.cipcodes, on='cipcode'))
 
         # add the award level labels
         if award_level:
-            # get the award level labels
-            al = datasets.award_levels()
-            # add the labels onto the dataframe
-            tmp = tmpdf
-            tmp = pd.merge(left=tmp, right=al, on="awlevel", how="left")
-            # set the update
-            tmpdf = tmp
+            steps.append(_label(datasets.award_levels, on='awlevel'))
 
         # keep only the first major
         if first_major:
-            tmp = tmpdf
-            tmp = tmp.loc[tmp.majornum == 1, ]
-            # set the update
-            tmpdf = tmp
+            steps.append(_filter({'majornum': 1}))
 
         # the award levels to keep
         if level_keep is not None:
             assert isinstance(level_keep, list), 'level_keep must be a list'
             if len(level_keep) > 0:
-                tmp = tmpdf
-                tmp = tmp.loc[tmp.awlevel.isin(level_keep), ]
-                # set the update
-                tmpdf = tmp
+                steps.append(_filter({'awlevel': level_keep}))
 
         # filter the columns
         if cols is not None:
             assert isinstance(cols, list), 'cols must be a list'
             if len(cols) > 0:
-                tmp = tmpdf
-                tmp_f = tmp >> select(cols)
-                tmpdf = tmp_f
+                steps.append(_select(cols))
 
-        # return the dataset
-        self.df = tmpdf
+        # run the steps now, or add them to the plan of a lazy survey
+        self._transform(steps)
@@ -0,0 +1,136 @@
+# comparison peers for every institution, the nearest neighbors on standardized HD, IC, SFA and IC_AY features
+import numpy as np
+import pandas as pd
+from pypeds import ipeds
+from pypeds import views
+
+
+# the features used by default, the categorical ones are one hot encoded and the rest standardized
+CATEGORICAL = ['sector', 'carnegie']
+NUMERIC = ['admit_rate', 'yield_rate', 'chg2ay3', 'chg4ay3', 'anyaidp', 'igrnt_p']
+
+
+def matrix(df, categorical=CATEGORICAL, numeric=NUMERIC, weights=None):
+    """
+    Return the feature matrix of a set of institutions as a float32 array, one row per row of df.
+
+    The numeric columns are standardized to mean 0 and standard deviation 1, and a missing value is put at
+    the mean so it does not count for or against a pair.  The categorical columns are one hot encoded.
+
+    Parameters:
+        df (DataFrame): one row per institution with the feature columns
+        categorical (list): the columns whose codes are categories, such as sector and carnegie
+        numeric (list): the columns that are measures, such as admit_rate
+        weights (dict): a multiplier for the columns of a feature, default 1 for each
+    """
+
+    weights = weights or {}
+    parts = []
+    for col in numeric:
+        x = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        std = np.nanstd(x) if np.isfinite(x).any() else 0
+        x = (x - np.nanmean(x)) / std if std > 0 else np.zeros(len(x))
+        parts.append(np.nan_to_num(x, nan=0.0)[:, None] * weights.get(col, 1))
+    for col in categorical:
+        codes, _ = pd.factorize(df[col])
+        onehot = np.zeros((len(df), codes.max() + 1 if len(codes) else 0))
+        known = codes >= 0
+        onehot[np.flatnonzero(known), codes[known]] = 1
+        parts.append(onehot * weights.get(col, 1))
+    return (np.hstack(parts + [np.zeros((len(df), 0))]).astype('float32'))
+
+
+def top_k(x, k=10, block=1024):
+    """
+    Return the k nearest rows of every row of x, by euclidean distance, as two arrays of shape (n, k) with the
+    row numbers and the distances, nearest first.  A row is never its own neighbor.
+
+    The squared distances come from one matrix product per block of rows, so memory stays at block x n
+    floats however many rows there are.
+
+    Parameters:
+        x (array): one row per institution, as from peers.matrix
+        k (int): the number of neighbors
+        block (int): the number of rows compared at a time
+    """
+
+    x = np.asarray(x, dtype='float32')
+    n = len(x)
+    k = min(k, n - 1)
+    norms = (x * x).sum(axis=1)
+    rows = np.zeros((n, max(k, 0)), dtype='int64')
+    dist = np.zeros((n, max(k, 0)), dtype='float32')
+    if k <= 0:
+        return ((rows, dist))
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        d2 = norms[start:stop, None] + norms[None, :] - 2 * (x[start:stop] @ x.T)
+        d2[np.arange(stop - start), np.arange(start, stop)] = np.inf
+        # the k smallest without sorting the whole row, then only those are sorted
+        near = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        near_d2 = np.take_along_axis(d2, near, axis=1)
+        order = np.argsort(near_d2, axis=1, kind='stable')
+        rows[start:stop] = np.take_along_axis(near, order, axis=1)
+        dist[start:stop] = np.sqrt(np.maximum(np.take_along_axis(near_d2, order, axis=1), 0))
+    return ((rows, dist))
+
+
+def features(fall_years=[2017], deg4yr=True, session=None):
+    """
+    Return the default peer features, one row per institution and fall, from HD, IC and ADM, SFA and IC_AY.
+
+    Parameters:
+        fall_years (list): a list of integers for the Fall years to include
+        deg4yr (bool): if True, keep only public/private non profit 4-year that are degree granting
+        session (Session): read the surveys through this registry, see registry.py
+    """
+
+    hd = ipeds.HD(years=fall_years, lazy=True, session=session)
+    hd.extract(cols=['unitid', 'instnm', 'sector', 'carnegie', 'pset4flg', 'deggrant'])
+    hd.transform(deg4yr=deg4yr, cols=['unitid', 'fall_year', 'instnm', 'sector', 'carnegie'])
+    ic = ipeds.IC(years=ipeds.IC.survey_years(fall_years), lazy=True, session=session)
+    ic.extract()
+    ic.transform(admit_rate=True, yield_rate=True, cols=['unitid', 'fall_year', 'admit_rate', 'yield_rate'])
+    sfa = ipeds.SFA(years=ipeds.SFA.survey_years(fall_years), lazy=True, session=session)
+    sfa.extract(cols=['anyaidp', 'igrnt_p'])
+    icay = ipeds.ICAY(years=ipeds.ICAY.survey_years(fall_years), lazy=True, session=session)
+    icay.extract(cols=['chg2ay3', 'chg4ay3'])
+    return (ipeds.join([hd, ic, sfa, icay], how='left'))
+
+
+@views.materialized(lambda a: [ipeds.get_hd(y) for y in ipeds.HD.survey_years(a['fall_years'])] +
+                    [ipeds.get_ic(y) for y in ipeds.IC.survey_years(a['fall_years'])] +
+                    [ipeds.get_adm(y) for y in ipeds.IC.survey_years(a['fall_years']) if y >= 2014] +
+                    [ipeds.get_sfa(y) for y in ipeds.SFA.survey_years(a['fall_years'])] +
+                    [ipeds.get_icay(y) for y in ipeds.ICAY.survey_years(a['fall_years'])])
+def peers(fall_years=[2017], k=10, deg4yr=True, categorical=CATEGORICAL, numeric=NUMERIC, weights=None, session=None):
+    """
+    Return the k most similar institutions of every institution, for each fall, one row per institution and peer.
+    The features are standardized within each fall, see peers.matrix, and compared with peers.top_k.
+    Results are kept like the views, so asking again for the same years and features is immediate.
+
+    Parameters:
+        fall_years (list): a list of integers for the Fall years to include
+        k (int): the number of peers for each institution
+        deg4yr (bool): if True, keep only public/private non profit 4-year that are degree granting
+        categorical (list): the categorical features, see peers.matrix
+        numeric (list): the numeric features, see peers.matrix
+        weights (dict): a multiplier for the columns of a feature
+        session (Session): read the surveys through this registry, see registry.py
+    """
+
+    df = features(fall_years=fall_years, deg4yr=deg4yr, session=session)
+    out = []
+    for fall_year, year in df.groupby('fall_year', sort=True):
+        year = year.reset_index(drop=True)
+        rows, dist = top_k(matrix(year, categorical=categorical, numeric=numeric, weights=weights), k=k)
+        n, found = rows.shape
+        unitid = year.unitid.to_numpy()
+        out.append(pd.DataFrame({'fall_year': fall_year,
+                                 'unitid': np.repeat(unitid, found),
+                                 'rank': np.tile(np.arange(found), n),
+                                 'peer': unitid[rows.ravel()],
+                                 'distance': dist.ravel()}))
+    if len(out) == 0:
+        return (pd.DataFrame(columns=['fall_year', 'unitid', 'rank', 'peer', 'distance']))
+    return (pd.concat(out, ignore_index=True))
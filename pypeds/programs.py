@@ -0,0 +1,161 @@
+# the program mix of each institution as a sparse institution x CIP matrix of completions, see C_A.to_sparse_matrix
+import collections
+import numpy as np
+import pandas as pd
+
+
+# a sparse matrix of completions with the unitid of each row and the CIP code of each column, both sorted
+ProgramMix = collections.namedtuple('ProgramMix', ['matrix', 'unitid', 'cip'])
+
+
+def _sparse():
+    try:
+        import scipy.sparse
+    except ImportError:
+        raise ImportError('the program mix matrix needs scipy, pip install pypeds[sparse]')
+    return (scipy.sparse)
+
+
+def cip_codes(cipcode, cip_digits=6):
+    """
+    Return the CIP codes as text at 2, 4 or 6 digits, for example 52, 52.02 or 52.0201.  Missing codes stay missing.
+
+    Parameters:
+        cipcode (Series): the numeric cipcode column of C_A or CDEP
+        cip_digits (int): 2 for the family, 4 for the series, 6 for the program
+    """
+
+    assert cip_digits in [2, 4, 6], 'cip_digits must be 2, 4 or 6'
+    code = np.round(pd.to_numeric(cipcode, errors='coerce').to_numpy(dtype='float64', na_value=np.nan) * 10000)
+    missing = np.isnan(code)
+    code = np.where(missing, 0, code).astype('int64')
+    family, series, program = code // 10000, code // 100 % 100, code % 100
+    if cip_digits == 2:
+        text = pd.Series(family).map('{:02d}'.format)
+    elif cip_digits == 4:
+        text = pd.Series(family).map('{:02d}'.format) + '.' + pd.Series(series).map('{:02d}'.format)
+    else:
+        text = pd.Series(family).map('{:02d}'.format) + '.' + pd.Series(series * 100 + program).map('{:04d}'.format)
+    text[missing] = None
+    text.index = cipcode.index
+    return (text)
+
+
+def build(df, level=None, cip_digits=6, value='ctotalt'):
+    """
+    Return the ProgramMix of a C_A extract, the completions of each unitid (row) in each CIP code (column).
+
+    Parameters:
+        df (DataFrame): C_A rows with unitid, cipcode, awlevel and the value column, for a single fall
+        level (list): only count these award levels, None for all of them
+        cip_digits (int): roll the programs up to 2 or 4 digit CIP codes, 6 keeps them
+        value (str): the column counted, ctotalt for all completions
+    """
+
+    sparse = _sparse()
+    if 'fall_year' in df.columns:
+        assert df.fall_year.nunique() <= 1, 'the program mix is for one fall, filter fall_year first'
+    keep = pd.to_numeric(df.cipcode, errors='coerce').ne(99).to_numpy()
+    if level is not None:
+        keep = keep & df.awlevel.isin(level if isinstance(level, (list, tuple, set)) else [level]).to_numpy()
+    df = df.loc[keep]
+    cip = cip_codes(df.cipcode, cip_digits)
+    values = pd.to_numeric(df[value], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    keep = cip.notna().to_numpy() & ~np.isnan(values) & (values != 0)
+
+    # the codes are sorted, so the same units and programs always get the same row and column
+    rows, unitid = pd.factorize(df.unitid[keep], sort=True)
+    cols, codes = pd.factorize(cip[keep], sort=True)
+    matrix = sparse.csr_matrix((values[keep], (rows, cols)), shape=(len(unitid), len(codes)))
+    matrix.sum_duplicates()
+    return (ProgramMix(matrix, pd.Index(unitid, name='unitid'), pd.Index(codes, name='cip')))
+
+
+def rollup(mix, cip_digits=2):
+    """
+    Return a ProgramMix rolled up to coarser CIP codes, by adding its columns together.
+
+    Parameters:
+        mix (ProgramMix): the matrix to roll up, from build or C_A.to_sparse_matrix
+        cip_digits (int): 2 for the family or 4 for the series, no finer than the codes of mix
+    """
+
+    sparse = _sparse()
+    assert cip_digits in [2, 4, 6], 'cip_digits must be 2, 4 or 6'
+    width = {2: 2, 4: 5, 6: 7}[cip_digits]
+    assert len(mix.cip) == 0 or mix.cip.str.len().min() >= width, 'cannot roll up to finer CIP codes'
+    cols, codes = pd.factorize(pd.Series(mix.cip).str[:width], sort=True)
+    # a 0/1 matrix that sends each column to its parent code
+    parent = sparse.csr_matrix((np.ones(len(cols)), (np.arange(len(cols)), cols)), shape=(len(cols), len(codes)))
+    return (ProgramMix((mix.matrix @ parent).tocsr(), mix.unitid, pd.Index(codes, name='cip')))
+
+
+def shares(mix):
+    """
+    Return the matrix of mix with each row divided by its total, the share of completions in each CIP code.
+
+    Parameters:
+        mix (ProgramMix): from build or C_A.to_sparse_matrix
+    """
+
+    sparse = _sparse()
+    total = np.asarray(mix.matrix.sum(axis=1)).ravel()
+    scale = np.divide(1.0, total, out=np.zeros_like(total), where=total != 0)
+    return (sparse.diags(scale) @ mix.matrix)
+
+
+def _normalized(mix):
+    # rows of unit length, so a product of two rows is their cosine
+    sparse = _sparse()
+    norm = np.sqrt(np.asarray(mix.matrix.multiply(mix.matrix).sum(axis=1)).ravel())
+    scale = np.divide(1.0, norm, out=np.zeros_like(norm), where=norm != 0)
+    return (sparse.diags(scale).dot(mix.matrix).tocsr())
+
+
+def similarity(mix, unitid=None):
+    """
+    Return the cosine similarity of the program mix of institutions.  For a unitid, a Series with its similarity
+    to every institution.  Otherwise the sparse matrix of every pair, in the row order of mix.
+
+    Parameters:
+        mix (ProgramMix): from build or C_A.to_sparse_matrix
+        unitid (int): only compare this institution to the others
+    """
+
+    x = _normalized(mix)
+    if unitid is not None:
+        row = mix.unitid.get_loc(unitid)
+        found = np.asarray((x @ x[row].T).todense()).ravel()
+        return (pd.Series(found, index=mix.unitid, name='similarity'))
+    return ((x @ x.T).tocsr())
+
+
+def most_similar(mix, k=10, block=1024):
+    """
+    Return the k institutions with the most similar program mix of every institution, by cosine similarity,
+    one row per institution and peer.  The pairs are compared a block of rows at a time.
+
+    Parameters:
+        mix (ProgramMix): from build or C_A.to_sparse_matrix
+        k (int): the number of peers for each institution
+        block (int): the number of rows compared at a time
+    """
+
+    x = _normalized(mix)
+    n = x.shape[0]
+    k = min(k, n - 1)
+    out = []
+    for start in range(0, n if k > 0 else 0, block):
+        stop = min(start + block, n)
+        sim = np.asarray((x[start:stop] @ x.T).todense())
+        sim[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+        near = np.argpartition(-sim, k - 1, axis=1)[:, :k]
+        near_sim = np.take_along_axis(sim, near, axis=1)
+        order = np.argsort(-near_sim, axis=1, kind='stable')
+        out.append(pd.DataFrame({'unitid': np.repeat(mix.unitid[start:stop].to_numpy(), k),
+                                 'rank': np.tile(np.arange(k), stop - start),
+                                 'peer': mix.unitid.to_numpy()[np.take_along_axis(near, order, axis=1).ravel()],
+                                 'similarity': np.take_along_axis(near_sim, order, axis=1).ravel()}))
+    if len(out) == 0:
+        return (pd.DataFrame(columns=['unitid', 'rank', 'peer', 'similarity']))
+    return (pd.concat(out, ignore_index=True))
@@ -0,0 +1,198 @@
+# small lookup tables used by the transforms, memoized in process and kept on disk so they work offline
+import os
+import glob
+import time
+import hashlib
+import threading
+import pandas as pd
+import requests
+from pypeds import cache
+from pypeds import config
+
+
+# the published csv for each lookup table
+URLS = {'region_xwalk': "https://docs.google.com/spreadsheets/d/e/2PACX-1vQ62ZENWQnUf2XnRs7hiVn7XhXhuCdZdeEOK2-BgkhppEI_A0IMepafWx9vaenOdhQptz5HIwxq3ZAM/pub?gid=0&single=true&output=csv",
+        'cipcodes': "https://docs.google.com/spreadsheets/d/e/2PACX-1vSjBizdy0EdtUllMJVe0vtq4TIXzsLSR0hnpEyS31-ASx5zjEBkfgLLqOjaHRCtYxqWEVs8eqY0KWJF/pub?gid=0&single=true&output=csv",
+        'award_levels': "https://docs.google.com/spreadsheets/d/e/2PACX-1vQVh15c5xErMKdhMea1AIa3jnArpXXlsSY1NSR_laFaYvhlni3C9jP9DKcHkZqNIsAE18zfMPf0qZFu/pub?gid=0&single=true&output=csv"}
+
+_lock = threading.Lock()
+_memo = {}
+_refreshing = set()
+
+
+def reference_dir():
+    """
+    Return the folder that holds the downloaded snapshots of the lookup tables, creating it if needed.
+    """
+
+    path = os.path.join(config.get_option('cache_dir'), 'reference')
+    os.makedirs(path, exist_ok=True)
+    return (path)
+
+
+def bundled(name):
+    """
+    Return the path to the snapshot of a lookup table shipped with the package, or None if there is none.
+
+    Parameters:
+        name (str): the lookup table, see reference.URLS
+    """
+
+    path = os.path.join(os.path.dirname(__file__), 'data', name + '.csv')
+    if not os.path.exists(path):
+        return (None)
+    return (path)
+
+
+def snapshots(name):
+    """
+    Return the downloaded snapshots of a lookup table, oldest first.
+
+    Each snapshot is named for the time it was downloaded and the hash of its content, so a new version is only
+    written when the table changed upstream.
+
+    Parameters:
+        name (str): the lookup table, see reference.URLS
+    """
+
+    return (sorted(glob.glob(os.path.join(reference_dir(), name, '*.csv'))))
+
+
+def _parse(path):
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    x = pd.read_csv(path)
+    x.columns = x.columns.str.lower()
+    # a snapshot shipped with the package may be older than the table, see ipeds.decode
+    x.attrs['bundled'] = os.path.dirname(os.path.abspath(path)) == os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+    # the content of the snapshot, so results built from the table can tell when it changed, see views.materialized
+    x.attrs['digest'] = digest
+    return (x)
+
+
+def download(name):
+    """
+    Download a lookup table and return the path of its snapshot, writing a new one only if the table changed.
+
+    Parameters:
+        name (str): the lookup table, see reference.URLS
+    """
+
+    assert name in URLS, 'unknown lookup table: {}'.format(name)
+    results = cache.session().get(URLS[name], timeout=60)
+    results.raise_for_status()
+    digest = hashlib.sha256(results.content).hexdigest()[:16]
+    folder = os.path.join(reference_dir(), name)
+    os.makedirs(folder, exist_ok=True)
+
+    # the same content as a snapshot we already have, mark it as checked
+    for path in snapshots(name):
+        if path.endswith('-' + digest + '.csv'):
+            os.utime(path)
+            return (path)
+
+    path = os.path.join(folder, time.strftime('%Y%m%dT%H%M%S', time.gmtime()) + '-' + digest + '.csv')
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(results.content)
+    os.replace(tmp, path)
+    return (path)
+
+
+def _locate(name):
+    # the newest download, then the copy shipped with the package, then the network
+    found = snapshots(name)
+    if len(found) > 0:
+        return (found[-1])
+    path = bundled(name)
+    if path is not None:
+        return (path)
+    return (download(name))
+
+
+def table(name):
+    """
+    Return a lookup table as a dataframe.  It is read once per session, later calls get a copy of the memo.
+
+    Parameters:
+        name (str): the lookup table, see reference.URLS
+    """
+
+    assert name in URLS, 'unknown lookup table: {}'.format(name)
+    with _lock:
+        df = _memo.get(name)
+    if df is None:
+        df = _parse(_locate(name))
+        with _lock:
+            _memo[name] = df
+        _maybe_refresh(name)
+    return (df.copy())
+
+
+def digest(name):
+    """
+    Return the sha256 of the snapshot of a lookup table that table() returns, reading the table if needed.
+
+    Parameters:
+        name (str): the lookup table, see reference.URLS
+    """
+
+    assert name in URLS, 'unknown lookup table: {}'.format(name)
+    with _lock:
+        df = _memo.get(name)
+    if df is None:
+        df = table(name)
+    return (df.attrs['digest'])
+
+
+def refresh(names=None):
+    """
+    Download the lookup tables again now and replace the memoized copies.
+
+    Parameters:
+        names (list): the lookup tables to refresh, defaults to all of them
+    """
+
+    if names is None:
+        names = list(URLS)
+    for name in names:
+        df = _parse(download(name))
+        with _lock:
+            _memo[name] = df
+
+
+def _maybe_refresh(name):
+    # refresh a stale table in the background, the one already read is used in the meantime
+    age = config.get_option('reference_refresh')
+    if age is None:
+        return
+    found = snapshots(name)
+    checked = os.path.getmtime(found[-1]) if len(found) > 0 else 0
+    if time.time() - checked < age:
+        return
+    with _lock:
+        if name in _refreshing:
+            return
+        _refreshing.add(name)
+    threading.Thread(target=_refresh_quietly, args=(name,), daemon=True,
+                     name='pypeds-reference-' + name).start()
+
+
+def _refresh_quietly(name):
+    try:
+        refresh([name])
+    except (requests.RequestException, OSError, ValueError):
+        # offline, keep the snapshot we have
+        pass
+    finally:
+        with _lock:
+            _refreshing.discard(name)
+
+
+def clear():
+    """
+    Forget the memoized lookup tables, the next call reads them from disk again.
+    """
+
+    with _lock:
+        _memo.clear()
@@ -0,0 +1,143 @@
+# one parsed copy of each survey year, shared by every survey object and view in a session
+import threading
+import collections
+from pypeds import config
+from pypeds import schemas
+
+
+_lock = threading.Lock()
+_active = []
+
+
+def current():
+    """
+    Return the session opened by the innermost with block, or None.
+    """
+
+    with _lock:
+        if len(_active) == 0:
+            return (None)
+        return (_active[-1])
+
+
+class Session(object):
+    """
+    A registry that keeps one parsed copy of each survey year (partition) for the survey classes and views.
+
+    Each survey year is read once, with all of its columns, and every survey object that asks for it
+    gets the rows and columns it wants from that copy.  The least recently used years are dropped once
+    the copies take more than max_bytes of memory.
+
+    Use it as a context manager, every survey object created without a session uses the one of the with block:
+
+        with pypeds.Session():
+            views.migration(years=[2017])
+            views.program_completions(fall_years=[2017])
+    """
+
+    def __init__(self, max_bytes=None):
+        """
+        Parameters:
+            max_bytes (int): the memory budget for the survey years kept, defaults to config.options['session_max_bytes']
+        """
+
+        self.max_bytes = max_bytes if max_bytes is not None else config.get_option('session_max_bytes')
+        self.partitions = collections.OrderedDict()
+        self.sizes = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._reading = {}
+
+    def __enter__(self):
+        with _lock:
+            _active.append(self)
+        return (self)
+
+    def __exit__(self, *args):
+        with _lock:
+            _active.remove(self)
+        self.clear()
+
+    def nbytes(self):
+        """
+        Return the memory taken by the survey years kept, in bytes.
+        """
+
+        with self._lock:
+            return (sum(self.sizes.values()))
+
+    def clear(self):
+        """
+        Drop every survey year kept by the session.
+        """
+
+        with self._lock:
+            self.partitions.clear()
+            self.sizes.clear()
+
+    def _partition(self, year_info, year, fall_year, timings=None):
+        # the whole survey year, read once even when several threads ask for it at the same time
+        from pypeds import ipeds
+
+        key = (year_info['survey'], int(year))
+        with self._lock:
+            if key not in self._reading:
+                self._reading[key] = threading.Lock()
+            reading = self._reading[key]
+        with reading:
+            with self._lock:
+                df = self.partitions.get(key)
+                if df is not None:
+                    self.partitions.move_to_end(key)
+                    self.hits += 1
+                    return (df)
+            df = ipeds.read_year(year_info, year, fall_year, timings=timings)
+            with self._lock:
+                self.misses += 1
+                if 'unitid' in df.columns:
+                    self.partitions[key] = df
+                    self.sizes[key] = int(df.memory_usage(deep=True).sum())
+                    self._evict(keep=key)
+        return (df)
+
+    def _evict(self, keep):
+        # least recently used first, but never the year just read
+        total = sum(self.sizes.values())
+        for key in list(self.partitions):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= self.sizes.pop(key)
+            del self.partitions[key]
+
+    def read_year(self, year_info, year, fall_year, cols=None, where=None, timings=None):
+        """
+        Return one survey year as a dataframe, as ipeds.read_year does, from the copy kept by the session.
+
+        Parameters:
+            year_info (dict): the url and survey id, as returned by ipeds.get_hd and friends
+            year (int): the survey year
+            fall_year (int): the fall of the academic year the survey reports on
+            cols (list): only keep these columns, plus the survey's key columns
+            where (dict or function): keep only the matching rows, see ipeds.read_survey
+            timings (list): if given, a dictionary with the seconds spent is appended for each step
+        """
+
+        from pypeds import ipeds
+
+        full = self._partition(year_info, year, fall_year, timings=timings)
+        if 'unitid' not in full.columns:
+            return (full)
+        columns = list(full.columns)
+        if cols is not None:
+            keys = schemas.KEYS.get(schemas.family(year_info['survey']), ['unitid'])
+            wanted = set(c.lower() for c in cols) | set(keys) | set(['survey_year', 'fall_year'])
+            if isinstance(where, dict):
+                wanted = wanted | set(where)
+            columns = [c for c in columns if c in wanted]
+        # always a copy, the transforms change their dataframe in place
+        if where is None:
+            return (full[columns].copy())
+        return (full.loc[ipeds._mask(full, where), columns].reset_index(drop=True))
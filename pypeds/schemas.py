@@ -0,0 +1,168 @@
+# column types for each survey family, applied when the csv is parsed
+import re
+
+
+# bump when a dtype below changes, anything persisted from a parsed survey is keyed on it
+SCHEMA_VERSION = 2
+
+# how IPEDS writes a missing value in the complete data files
+NA_VALUES = ['.', ' ']
+
+# the survey file id, or csv name, to the survey family it belongs to
+FAMILIES = [('ICAY', r'^IC\d{4}_AY'),
+            ('IC', r'^IC\d{4}(_RV)?$'),
+            ('HD', r'^HD\d{4}'),
+            ('ADM', r'^ADM\d{4}'),
+            ('SFA', r'^SFA\d{4}'),
+            ('EFC', r'^EF\d{4}C'),
+            ('EFD', r'^EF\d{4}D'),
+            ('OM', r'^OM\d{4}'),
+            ('FF1', r'^F\d{4}_F1A'),
+            ('FF2', r'^F\d{4}_F2'),
+            ('C_A', r'^C\d{4}_A'),
+            ('CDEP', r'^C\d{4}DEP')]
+
+# the columns that identify a row in each survey family, always parsed
+KEYS = {'HD': ['unitid'],
+        'IC': ['unitid'],
+        'ADM': ['unitid'],
+        'SFA': ['unitid'],
+        'EFC': ['unitid', 'efcstate', 'line'],
+        'EFD': ['unitid'],
+        'ICAY': ['unitid'],
+        'OM': ['unitid', 'omchrt'],
+        'FF1': ['unitid'],
+        'FF2': ['unitid'],
+        'C_A': ['unitid', 'cipcode', 'majornum', 'awlevel'],
+        'CDEP': ['unitid', 'cipcode']}
+
+# every survey shares the id and the imputation flags (x + varname)
+_COMMON = {'dtypes': {'unitid': 'int32'},
+           'patterns': [(r'^x', 'category')]}
+
+# dtypes: explicit columns, patterns: (regex, dtype) tried in order,
+# default: dtype for any other column, None lets pandas infer it
+SCHEMAS = {
+    'HD': {'dtypes': {'instnm': str, 'ialias': str, 'addr': str, 'city': str, 'zip': str,
+                      'chfnm': str, 'chftitle': str, 'gentele': str, 'faxtele': str,
+                      'ein': str, 'dunsnum': str, 'opeid': str, 'webaddr': str,
+                      'stabbr': 'category', 'act': 'category', 'countynm': 'category',
+                      'fips': 'Int8', 'obereg': 'Int8', 'opeflag': 'Int8', 'sector': 'Int8',
+                      'iclevel': 'Int8', 'control': 'Int8', 'hloffer': 'Int8', 'ugoffer': 'Int8',
+                      'groffer': 'Int8', 'hdegofr1': 'Int8', 'deggrant': 'Int8', 'hbcu': 'Int8',
+                      'hospital': 'Int8', 'medical': 'Int8', 'tribal': 'Int8', 'locale': 'Int8',
+                      'openpubl': 'Int8', 'cyactive': 'Int8', 'postsec': 'Int8', 'pseflag': 'Int8',
+                      'pset4flg': 'Int8', 'rptmth': 'Int8', 'instcat': 'Int8', 'landgrnt': 'Int8',
+                      'instsize': 'Int8', 'f1systyp': 'Int8', 'carnegie': 'Int16', 'cngdstcd': 'Int16',
+                      'csa': 'Int16', 'cbsa': 'Int32', 'necta': 'Int32', 'countycd': 'Int32',
+                      'latitude': 'float32', 'longitud': 'float32'},
+           'patterns': [(r'^c\d{2}(basic|ipug|ipgrd|ugprf|enprf|szset)$', 'Int8'),
+                        (r'^cc(basic|ipug|ipgrd|ugprf|enprf|sizset)$', 'Int8')],
+           'default': None},
+    'IC': {'dtypes': {'cntlaffi': 'Int8', 'relaffil': 'Int16', 'calsys': 'Int8',
+                      'openadmp': 'Int8', 'room': 'Int8', 'board': 'Int8'},
+           'patterns': [(r'^(peo\d+istr|level\d+|admcon\d+|slo\d+|stusrv\d+|libres\d+|tuitpl\d*|dstnc\w*)$', 'Int8'),
+                        (r'^(applcn|admssn|enrl|sat|act)\w*$', 'float32'),
+                        (r'^(applfee\w*|roomcap|boardcap|roomamt|boardamt|rmbrdamt|mealswk)$', 'float32')],
+           'default': None},
+    'ADM': {'dtypes': {},
+            'patterns': [(r'^admcon\d+$', 'Int8')],
+            'default': 'float32'},
+    'ICAY': {'dtypes': {},
+             'patterns': [],
+             'default': 'float32'},
+    # aid totals such as igrnt_t and loan_t run into the hundreds of millions, past what float32 holds exactly
+    'SFA': {'dtypes': {},
+            'patterns': [],
+            'default': 'float64'},
+    'EFC': {'dtypes': {'efcstate': 'Int16', 'line': 'Int16'},
+            'patterns': [],
+            'default': 'float32'},
+    'EFD': {'dtypes': {},
+            'patterns': [],
+            'default': 'float32'},
+    'OM': {'dtypes': {'omchrt': 'Int16'},
+           'patterns': [],
+           'default': 'float32'},
+    # finance totals run into the billions, past what float32 holds exactly
+    'FF1': {'dtypes': {},
+            'patterns': [],
+            'default': 'float64'},
+    'FF2': {'dtypes': {},
+            'patterns': [],
+            'default': 'float64'},
+    # cipcode stays float64 to line up with datasets.cipcodes()
+    'C_A': {'dtypes': {'cipcode': 'float64', 'majornum': 'Int8', 'awlevel': 'Int8'},
+            'patterns': [],
+            'default': 'float32'},
+    'CDEP': {'dtypes': {'cipcode': 'float64'},
+             'patterns': [],
+             'default': 'float32'},
+}
+
+
+def family(survey):
+    """
+    Return the survey family, for example ICAY, for a survey file id or csv name.  None if it is not known.
+
+    Parameters:
+        survey (str): the survey file id or csv name, for example IC2017_AY or ic2017_ay_rv.csv
+    """
+
+    name = re.sub(r'\.csv$', '', survey.strip().upper())
+    for fam, pattern in FAMILIES:
+        if re.search(pattern, name):
+            return (fam)
+    return (None)
+
+
+def dtype_of(fam, column):
+    """
+    Return the dtype registered for a lower case column name in a survey family, or None to infer it.
+
+    Parameters:
+        fam (str): the survey family, see schemas.FAMILIES
+        column (str): the lower case column name
+    """
+
+    schema = SCHEMAS.get(fam)
+    if schema is None:
+        return (_COMMON['dtypes'].get(column))
+    for dtypes in [_COMMON['dtypes'], schema['dtypes']]:
+        if column in dtypes:
+            return (dtypes[column])
+    for pattern, dtype in _COMMON['patterns'] + schema['patterns']:
+        if re.search(pattern, column):
+            return (dtype)
+    return (schema['default'])
+
+
+def dtypes(fam, columns):
+    """
+    Return a dictionary of dtypes for read_csv, keyed on the columns exactly as they appear in the file.
+
+    Parameters:
+        fam (str): the survey family, see schemas.FAMILIES
+        columns (list): the column names from the header of the csv
+    """
+
+    out = {}
+    for column in columns:
+        dtype = dtype_of(fam, column.strip().lower())
+        if dtype is not None:
+            out[column] = dtype
+    return (out)
+
+
+def usecols(fam, columns, cols):
+    """
+    Return the columns of the csv to parse for a requested list of columns, keys included.
+
+    Parameters:
+        fam (str): the survey family, see schemas.FAMILIES
+        columns (list): the column names from the header of the csv
+        cols (list): the lower case column names requested, names not in this survey year are skipped
+    """
+
+    wanted = set(c.lower() for c in cols) | set(KEYS.get(fam, ['unitid']))
+    return ([c for c in columns if c.strip().lower() in wanted])
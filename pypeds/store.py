@@ -0,0 +1,230 @@
+# local parquet store of parsed survey years, so a survey file is only parsed once per version
+import os
+import glob
+import tempfile
+import threading
+import numpy as np
+from pypeds import config
+from pypeds import schemas
+
+
+def enabled():
+    """
+    Return True if parsed survey years are kept in the store.  Needs the store option and pyarrow.
+    """
+
+    if not config.get_option('store'):
+        return (False)
+    try:
+        import pyarrow.parquet
+    except ImportError:
+        return (False)
+    return (True)
+
+
+def store_dir():
+    """
+    Return the root folder of the parquet store.
+    """
+
+    return (os.path.join(config.get_option('cache_dir'), 'store'))
+
+
+def partition(survey, year, digest):
+    """
+    Return the parquet file for a survey year, keyed on the hash of the source zip and the schema version.
+
+    Parameters:
+        survey (str): the survey file id, for example HD2017
+        year (int): the survey year
+        digest (str): the sha256 of the source zip, see cache.digest
+    """
+
+    fam = schemas.family(survey) or survey
+    folder = os.path.join(store_dir(), fam.lower(), str(year))
+    name = '{}-{}-v{}.parquet'.format(survey.lower(), digest[:16], schemas.SCHEMA_VERSION)
+    return (os.path.join(folder, name))
+
+
+_lock = threading.Lock()
+_indexes = {}
+
+
+def _replace(path, save):
+    # write to a temp file of our own next to path, then move it into place, so writers never share a temp file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            save(f)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def write(df, path):
+    """
+    Write a parsed survey year to the store, replacing older versions of the same survey file.
+
+    Parameters:
+        df (DataFrame): the parsed survey year, with survey_year and fall_year
+        path (str): the parquet file from store.partition
+    """
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    # sorted on unitid so row group statistics can skip most of the file for an id
+    if 'unitid' in df.columns:
+        df = df.sort_values('unitid', kind='stable').reset_index(drop=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    _replace(path, lambda f: pq.write_table(table, f, row_group_size=config.get_option('store_row_group')))
+    if 'unitid' in df.columns:
+        _write_index(df['unitid'], path)
+
+    # a revised upstream file, or a new schema version, makes the older files stale
+    survey = os.path.basename(path).split('-')[0]
+    for old in glob.glob(os.path.join(folder, survey + '-*.parquet')) + glob.glob(os.path.join(folder, survey + '-*.idx.npy')):
+        if old != path and old != index_path(path):
+            os.remove(old)
+
+
+# ================================= unitid index
+
+def index_path(path):
+    """
+    Return the index file kept next to a survey year in the store.
+
+    Parameters:
+        path (str): the parquet file from store.partition
+    """
+
+    return (path[:-len('.parquet')] + '.idx.npy')
+
+
+def _write_index(unitid, path):
+    # the rows of each unitid are contiguous since the file is sorted, so keep where each one starts and stops
+    unitid = unitid.dropna().to_numpy(dtype='int64')
+    ids, starts = np.unique(unitid, return_index=True)
+    stops = np.append(starts[1:], len(unitid))
+    rows = np.stack([ids, starts, stops], axis=1).astype('int64')
+    _replace(index_path(path), lambda f: np.save(f, rows))
+    with _lock:
+        _indexes[path] = rows
+    return (rows)
+
+
+def index(path):
+    """
+    Return the unitid index of a survey year in the store, an array with a row of unitid, first row and
+    last row + 1 for each institution.  It is built from the parquet file if it is missing.
+
+    Parameters:
+        path (str): the parquet file from store.partition
+    """
+
+    import pyarrow.parquet as pq
+
+    with _lock:
+        rows = _indexes.get(path)
+    if rows is not None:
+        return (rows)
+    try:
+        rows = np.load(index_path(path))
+    except (OSError, ValueError):
+        # a survey year written before the index existed
+        return (_write_index(pq.read_table(path, columns=['unitid']).to_pandas()['unitid'], path))
+    with _lock:
+        _indexes[path] = rows
+    return (rows)
+
+
+def lookup(path, unitids, cols=None, keys=None):
+    """
+    Read the rows of a few institutions from a survey year in the store.  The unitid index gives their
+    row offsets, so only the row groups that hold them are read and nothing is scanned.
+
+    Parameters:
+        path (str): the parquet file from store.partition
+        unitids (list): the institutions to read
+        cols (list): the columns to read, None for all of them
+        keys (list): columns that are always read when cols is given, such as the survey keys
+    """
+
+    import pyarrow.parquet as pq
+
+    file = pq.ParquetFile(path)
+    columns = None
+    if cols is not None:
+        wanted = set(cols) | set(keys or []) | set(['unitid', 'survey_year', 'fall_year'])
+        columns = [c for c in file.schema_arrow.names if c in wanted]
+
+    # the row offsets of the institutions that are in this survey year
+    rows = index(path)
+    unitids = np.unique(np.asarray(unitids, dtype='int64'))
+    at = np.minimum(np.searchsorted(rows[:, 0], unitids), max(len(rows) - 1, 0))
+    found = rows[at[rows[at, 0] == unitids]] if len(rows) > 0 else rows
+    offsets = np.concatenate([np.arange(start, stop) for _, start, stop in found] + [np.zeros(0, dtype='int64')])
+    if len(offsets) == 0:
+        return (file.schema_arrow.empty_table().select(columns or file.schema_arrow.names).to_pandas())
+
+    # only the row groups that hold those rows, then the rows within them
+    sizes = [file.metadata.row_group(i).num_rows for i in range(file.num_row_groups)]
+    bounds = np.cumsum([0] + sizes)
+    which = np.searchsorted(bounds, offsets, side='right') - 1
+    groups = np.unique(which)
+    table = file.read_row_groups(list(groups), columns=columns)
+    # the offset of each row within the row groups read
+    shift = np.cumsum([0] + [sizes[g] for g in groups])
+    local = offsets - bounds[which] + shift[np.searchsorted(groups, which)]
+    return (table.take(local).to_pandas())
+
+
+def _filters(where):
+    # a where dict as parquet filters, so row groups that cannot match are never read
+    filters = []
+    for col, value in where.items():
+        if isinstance(value, (list, tuple, set)):
+            filters.append((col, 'in', list(value)))
+        else:
+            filters.append((col, '==', value))
+    return (filters)
+
+
+def read(path, cols=None, keys=None, where=None):
+    """
+    Read a survey year from the store, only the requested columns and the row groups that can match.
+
+    Parameters:
+        path (str): the parquet file from store.partition
+        cols (list): the columns to read, None for all of them
+        keys (list): columns that are always read when cols is given, such as the survey keys
+        where (dict or function): the row filter, as in read_survey
+    """
+
+    import pyarrow.parquet as pq
+
+    columns = None
+    if cols is not None:
+        names = pq.read_schema(path).names
+        wanted = set(cols) | set(keys or []) | set(['survey_year', 'fall_year'])
+        if isinstance(where, dict):
+            wanted = wanted | set(where)
+        columns = [c for c in names if c in wanted]
+
+    filters = None
+    if isinstance(where, dict):
+        names = pq.read_schema(path).names
+        if any(col not in names for col in where):
+            # filtering on a column this survey year does not have, nothing can match
+            return (pq.read_table(path, columns=columns).slice(0, 0).to_pandas())
+        filters = _filters(where)
+
+    df = pq.read_table(path, columns=columns, filters=filters).to_pandas()
+    if callable(where):
+        from pypeds import ipeds
+        df = df.loc[ipeds._mask(df, where)].reset_index(drop=True)
+    return (df)
@@ -1,12 +1,220 @@
 # layer above ETL framework - views are tasks to build specific datasets
 import pandas as pd
 from dfply import *
+import os
+import glob
+import json
+import hashlib
+import inspect
+import warnings
+import functools
+import threading
+import collections
+import concurrent.futures
 from pypeds import ipeds
 from pypeds import datasets
+from pypeds import config
+from pypeds import cache
+from pypeds import schemas
+from pypeds import reference
+
+
+# the HD columns the deg4yr, service, lower_us and regions transforms filter or join on
+HD_FILTER_COLS = ['sector', 'pset4flg', 'deggrant', 'obereg', 'fips']
+
+
+def _run_graph(tasks, workers=None):
+    """
+    Run the tasks of a view on a thread pool, each one as soon as the tasks it depends on are done, and
+    return a dictionary of their results.
+
+    Parameters:
+        tasks (dict): the task name to a tuple of (function, list of task names), the function is called
+                      with the results of the tasks it depends on, in that order
+        workers (int): the number of threads, defaults to config.options['view_workers']
+    """
+
+    if workers is None:
+        workers = config.get_option('view_workers')
+    results = {}
+    running = {}
+    waiting = dict(tasks)
+    # a separate pool from the downloads, so a survey waiting on its zips never holds a download thread
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pypeds-view') as pool:
+        while waiting or running:
+            for name, (func, deps) in list(waiting.items()):
+                if all(d in results for d in deps):
+                    running[pool.submit(func, *[results[d] for d in deps])] = name
+                    del waiting[name]
+            assert running, 'the view tasks depend on each other in a loop'
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                try:
+                    results[running.pop(future)] = future.result()
+                except BaseException:
+                    for other in running:
+                        other.cancel()
+                    raise
+    return (results)
+
+
+# ================================================== materialized views
+# a view is only built again when its arguments change or one of its survey files is revised upstream
+
+_lock = threading.Lock()
+_memo = collections.OrderedDict()
+
+
+def views_dir():
+    """
+    Return the folder that holds the materialized views, creating it if needed.
+    """
+
+    path = os.path.join(config.get_option('cache_dir'), 'views')
+    os.makedirs(path, exist_ok=True)
+    return (path)
+
+
+def _sources_key(year_infos):
+    # the hash of every survey file a view reads, downloading or revalidating them as needed
+    cache.prefetch(year_infos)
+    sha = hashlib.sha256(str(schemas.SCHEMA_VERSION).encode())
+    for info in sorted(year_infos, key=lambda i: i['survey']):
+        cache.fetch(info['url'], info['survey'])
+        sha.update('{}={}'.format(info['survey'], cache.digest(info['survey'])).encode())
+    return (sha.hexdigest())
+
+
+def _tables_key(tables):
+    # the hash of the lookup tables a view joins on, so a refreshed table gives a new key
+    sha = hashlib.sha256()
+    for name in sorted(tables):
+        sha.update('{}={}'.format(name, reference.digest(name)).encode())
+    return (sha.hexdigest())
+
+
+@functools.lru_cache(maxsize=None)
+def _package_digest():
+    # the source of every pypeds module, a change to a transform or a reader changes the views built on it
+    sha = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py'))):
+        with open(path, 'rb') as f:
+            sha.update(os.path.basename(path).encode() + b'\0' + f.read())
+    return (sha.hexdigest())
+
+
+def _code_version(view):
+    # the package version, the source of its modules and of the view, so changed code does not return the old results
+    import pypeds
+    try:
+        source = inspect.getsource(view)
+    except (OSError, TypeError):
+        # no source, such as a frozen install, the package version alone
+        source = ''
+    return (pypeds.__version__ + '-' + _package_digest()[:16] + '-' + hashlib.sha256(source.encode()).hexdigest()[:16])
+
+
+def _read_view(path):
+    try:
+        return (pd.read_parquet(path))
+    except (ImportError, OSError, ValueError):
+        return (None)
+
+
+def _write_view(df, path):
+    # sparse columns, as in views.master, have no parquet type, so those views are kept in memory only
+    if any(isinstance(dtype, pd.SparseDtype) for dtype in df.dtypes):
+        return
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    tmp = path + '.tmp'
+    try:
+        df.to_parquet(tmp)
+    except (ImportError, ValueError, TypeError) as e:
+        # no pyarrow, or a column parquet cannot hold, keep the view in memory only
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        if not isinstance(e, ImportError):
+            warnings.warn('the {} view is kept in memory only, it could not be written to parquet: {}'.format(
+                os.path.basename(folder), e))
+        return
+    os.replace(tmp, path)
+    # the same view and arguments over an older version of a survey file
+    prefix = os.path.basename(path).split('-')[0]
+    for old in glob.glob(os.path.join(folder, prefix + '-*.parquet')):
+        if old != path:
+            os.remove(old)
+
+
+def _remember(key, df):
+    with _lock:
+        _memo[key] = df
+        _memo.move_to_end(key)
+        while len(_memo) > config.get_option('view_memo_size'):
+            _memo.popitem(last=False)
+
+
+def materialized(sources, tables=lambda a: []):
+    """
+    Decorator that keeps the result of a view, in memory and as parquet under cache_dir/views, keyed on the
+    view, its arguments, the pypeds version and the source of its modules and of the view, the sha256 of every
+    survey file it reads, and the sha256 of the lookup tables it uses.  A revised survey file, a refreshed lookup
+    table or changed code gives a new key, so the view is built again.  Turn it off with config.set_option('view_cache', False).
+
+    Parameters:
+        sources (function): takes the arguments of the view, as a dictionary, and returns the url and survey id
+                            of every survey file it reads, as from ipeds.get_hd and friends
+        tables (function): takes the arguments of the view, as a dictionary, and returns the lookup tables it
+                           uses, see reference.URLS
+    """
+
+    def wrap(view):
+        version = _code_version(view)
+
+        @functools.wraps(view)
+        def run(*args, **kwargs):
+            if not config.get_option('view_cache'):
+                return (view(*args, **kwargs))
+            bound = inspect.signature(view).bind(*args, **kwargs)
+            bound.apply_defaults()
+            # the session only changes where the surveys are read from, not the result
+            arguments = {k: v for k, v in bound.arguments.items() if k != 'session'}
+            params = json.dumps(arguments, sort_keys=True, default=str)
+            params = hashlib.sha256((view.__name__ + version + params).encode()).hexdigest()[:16]
+            data = _sources_key(sources(bound.arguments)) + _tables_key(tables(bound.arguments))
+            key = params + '-' + hashlib.sha256(data.encode()).hexdigest()[:16]
+
+            with _lock:
+                df = _memo.get(key)
+            if df is None:
+                path = os.path.join(views_dir(), view.__name__, key + '.parquet')
+                df = _read_view(path) if os.path.exists(path) else None
+                if df is None:
+                    df = view(*args, **kwargs)
+                    _write_view(df, path)
+                _remember(key, df)
+            # a copy, so changing the result does not change the one kept
+            return (df.copy())
+        return (run)
+    return (wrap)
+
+
+def clear_views():
+    """
+    Remove every materialized view, from memory and from disk.
+    """
+
+    with _lock:
+        _memo.clear()
+    for path in glob.glob(os.path.join(views_dir(), '*', '*.parquet')):
+        os.remove(path)
 
 
 # ================================================== migration dataset
 # the migration data, with school and residence region data appended
+@materialized(lambda a: [ipeds.get_efc(int(y)) for y in a['years']] +
+              [ipeds.get_hd(int(y)) for y in a['years']],
+              tables=lambda a: ['region_xwalk'])
 def migration(years=[2018],
               efc_line=list(range(1, 99)),
               efc_cols=['unitid', 'fall_year', 'line', 'efres02'],
@@ -15,7 +223,8 @@ def migration(years=[2018],
               hd_lower48=None,
               hd_cols=['unitid', 'fall_year', 'instnm',
                        'fips', 'obereg', 'sector', 'latitude',
-                       'longitud']):
+                       'longitud'],
+              session=None):
     """
     Build a migration dataset, with common data mappings using the lower
     level API.
@@ -28,26 +237,34 @@ def migration(years=[2018],
         hd_service (bool): boolean (default = True) which if True, will remove US service schools
         hd_lower48 (bool): boolean (default = None) while if True, will only keep lower 48 states
         hd_cols (list): a list of valid column names for the HD survey.  Only these columns will be returned.
+        session (Session): read the surveys through this registry, see registry.py
     """
 
     # get the migration data for the years parameter
-    m = ipeds.EFC(years=years)
-    m.extract()
-    m.transform(line=efc_line)
-    m.transform(cols=efc_cols)
-    m = m.load()
+    def efc():
+        m = ipeds.EFC(years=years, lazy=True, session=session)
+        m.extract(cols=efc_cols, where={'line': efc_line})
+        m.transform(line=efc_line)
+        m.transform(cols=efc_cols)
+        return (m.load())
 
     # get the inst data
-    i = ipeds.HD(years=years)
-    i.extract()
-    i.transform(deg4yr=hd_deg4yr)
-    i.transform(service=hd_service)
-    i.transform(lower_us=hd_lower48)
-    i.transform(cols=hd_cols)
-    inst = i.load()
+    def hd():
+        i = ipeds.HD(years=years, lazy=True, session=session)
+        i.extract(cols=hd_cols + HD_FILTER_COLS)
+        i.transform(deg4yr=hd_deg4yr)
+        i.transform(service=hd_service)
+        i.transform(lower_us=hd_lower48)
+        i.transform(cols=hd_cols)
+        return (i.load())
 
-    # the region dataset
-    r = datasets.region_xwalk()
+    # both surveys, and the region dataset, at the same time
+    parts = _run_graph({'efc': (efc, []),
+                        'hd': (hd, []),
+                        'regions': (datasets.region_xwalk, [])})
+    m = parts['efc']
+    inst = parts['hd']
+    r = parts['regions']
 
     # join the inst data onto migration
     # inner join to keep the school filters
@@ -70,6 +287,10 @@ def migration(years=[2018],
 
 # ================================================== discounting dataset
 # private institution tuition discounting
+@materialized(lambda a: [ipeds.get_hd(int(y)) for y in a['fall_years']] +
+              [ipeds.get_icay(int(y)) for y in a['fall_years']] +
+              [ipeds.get_sfa(y) for y in ipeds.SFA.survey_years(a['fall_years'])] +
+              [ipeds.get_ff2(y) for y in ipeds.FF2.survey_years(a['fall_years'])])
 def tuition_discounting(fall_years=[2017],
                         hd_deg4yr=True,
                         hd_service=True,
@@ -93,7 +314,8 @@ def tuition_discounting(fall_years=[2017],
                                   'f2d01',
                                   'f2c08',
                                   'f2h01',
-                                  'f2h02']):
+                                  'f2h02'],
+                        session=None):
     """
     Build a tuition tuition discounting dataset
 
@@ -106,50 +328,58 @@ def tuition_discounting(fall_years=[2017],
         sfa_cols (list): a list of valid column names for the SFA survey.  Only these columns will be returned.
         icay_cols (list): a list of valid column names for the ICAY survey.  Only these columns will be returned.
         ff2_cols (list): a list of valid column names for FASB survey. Only these columns will be returned
+        session (Session): read the surveys through this registry, see registry.py
     """
 
     # the schools
-    i = ipeds.HD(years=fall_years)
-    i.extract()
-    i.transform(deg4yr=hd_deg4yr)
-    i.transform(service=hd_service)
-    i.transform(lower_us=hd_lower48)
-    i.transform(cols=hd_cols)
-    inst = i.load()
+    def hd():
+        i = ipeds.HD(years=fall_years, lazy=True, session=session)
+        i.extract(cols=hd_cols + HD_FILTER_COLS)
+        i.transform(deg4yr=hd_deg4yr)
+        i.transform(service=hd_service)
+        i.transform(lower_us=hd_lower48)
+        i.transform(cols=hd_cols)
+        return (i.load())
 
     # keep only privates
-    inst = inst.loc[inst.sector == 2, ]
+    def privates(inst):
+        return (inst.loc[inst.sector == 2, ])
 
     # the student finaid data
-    # add one because the aid for the fall data is released a year later
-    years = list(np.array(fall_years) + 1)
-    s = ipeds.SFA(years=years)
-    s.extract()
-    s.transform(cols=sfa_cols)
-    aid = s.load()
+    # the aid for the fall data is released a year later
+    def sfa():
+        s = ipeds.SFA(years=ipeds.SFA.survey_years(fall_years), lazy=True, session=session)
+        s.extract(cols=sfa_cols)
+        s.transform(cols=sfa_cols)
+        return (s.load())
 
     # the charges
-    c = ipeds.ICAY(years=fall_years)
-    c.extract()
-    c.transform(cols=icay_cols)
-    charges = c.load()
+    def icay():
+        c = ipeds.ICAY(years=fall_years, lazy=True, session=session)
+        c.extract(cols=icay_cols)
+        c.transform(cols=icay_cols)
+        return (c.load())
 
     # the private FASB data
-    f = ipeds.FF2(years=years)
-    f.extract()
-    f.transform(cols=ff2_cols)
-    fin = f.load()
-
-    # merge the datasets
-    df = pd.merge(inst, aid, on=['unitid', 'fall_year'], how="left")
-    df = pd.merge(df, charges, on=['unitid', 'fall_year'], how="left")
-    df = pd.merge(df, fin, on=['unitid', 'fall_year'], how="left")
-
-    # need to change charges
-    df.chg2ay3 = pd.to_numeric(df['chg2ay3'], errors='coerce')
-    df.chg4ay3 = pd.to_numeric(df['chg4ay3'], errors='coerce')
-    df.chg5ay3 = pd.to_numeric(df['chg5ay3'], errors='coerce')
-    df.chg6ay3 = pd.to_numeric(df['chg6ay3'], errors='coerce')
+    def ff2():
+        f = ipeds.FF2(years=ipeds.FF2.survey_years(fall_years), lazy=True, session=session)
+        f.extract(cols=ff2_cols)
+        f.transform(cols=ff2_cols)
+        return (f.load())
+
+    # the four surveys at the same time, only the merges wait on them
+    parts = _run_graph({'hd': (hd, []),
+                        'inst': (privates, ['hd']),
+                        'sfa': (sfa, []),
+                        'icay': (icay, []),
+                        'ff2': (ff2, [])})
+    inst = parts['inst']
+    aid = parts['sfa']
+    charges = parts['icay']
+    fin = parts['ff2']
+
+    # join the datasets on unitid and fall_year, in one pass
+    df = ipeds.join([inst, aid, charges, fin], how='left')
 
     # add the metrics
     df['discount'] = df.f2c08 / (df.f2c08 + df.f2d01)
@@ -169,6 +399,9 @@ def tuition_discounting(fall_years=[2017],
 
 # ================================================== completions by program
 # a dataframe with school and completions by program data
+@materialized(lambda a: [ipeds.get_hd(int(y)) for y in a['fall_years']] +
+              [ipeds.get_ca(y) for y in ipeds.C_A.survey_years(a['fall_years'])],
+              tables=lambda a: ['region_xwalk'] if a['hd_regions'] else [])
 def program_completions(fall_years=[2017],
                         hd_deg4yr=True,
                         hd_service=False,
@@ -176,7 +409,8 @@ def program_completions(fall_years=[2017],
                         hd_regions=True,
                         hd_cols=['unitid', 'fall_year', 'instnm', 'fips',
                                  'carnegie', 'sector', 'latitude', 'longitud'],
-                        degree_code=[5, 7]):
+                        degree_code=[5, 7],
+                        session=None):
     """
     Build a dataset of school info and program completions.  
 
@@ -188,24 +422,32 @@ def program_completions(fall_years=[2017],
         hd_regions (bool): boolean (default = True) which if True, will add state and region data at the institutional level
         hd_cols (list): a list of valid column names for the HD survey.  Only these columns will be returned.
         degree_code (list): a list of valid values for the awlevel column in C_A (completions by program)
+        session (Session): read the surveys through this registry, see registry.py
     """
 
     # get the inst data
-    i = ipeds.HD(years=fall_years)
-    i.extract()
-    i.transform(deg4yr=hd_deg4yr)
-    i.transform(service=hd_service)
-    i.transform(lower_us=hd_lower48)
-    i.transform(regions=hd_regions)
-    i.transform(cols=hd_cols)
-    inst = i.load()
+    def hd():
+        i = ipeds.HD(years=fall_years, lazy=True, session=session)
+        i.extract(cols=hd_cols + HD_FILTER_COLS)
+        i.transform(deg4yr=hd_deg4yr)
+        i.transform(service=hd_service)
+        i.transform(lower_us=hd_lower48)
+        i.transform(regions=hd_regions)
+        i.transform(cols=hd_cols)
+        return (i.load())
 
     # the completions for the academic year are reported a year later
-    years = list(np.array(fall_years) + 1)
-    c = ipeds.C_A(years=years)
-    c.extract()
-    c.transform(level_keep=degree_code)
-    comps = c.load()
+    def c_a():
+        c = ipeds.C_A(years=ipeds.C_A.survey_years(fall_years), lazy=True, session=session)
+        c.extract(where={'majornum': 1, 'awlevel': degree_code})
+        c.transform(level_keep=degree_code)
+        return (c.load())
+
+    # both surveys at the same time
+    parts = _run_graph({'hd': (hd, []),
+                        'c_a': (c_a, [])})
+    inst = parts['hd']
+    comps = parts['c_a']
 
     # merge the data together
     # only those that match
@@ -215,5 +457,160 @@ def program_completions(fall_years=[2017],
     return (df)
 
 
+# ================================================== master view
+# one row per school and fall, with completions by cip family and freshmen by home state as columns
+
+def _sparse_pivot(index, key, column, values, prefix):
+    """
+    Sum long rows into one sparse column per code, lined up on the rows of the result.  Zeros are not stored.
+
+    Parameters:
+        index (Index): the ipeds._year_key of the fall_year and unitid of each result row
+        key (array): the same key for each long row
+        column (Series): the code of each long row, one column per code
+        values (array): the numbers to sum
+        prefix (str): put before each code in the column names
+    """
+
+    rows = index.get_indexer(key)
+    values = np.asarray(values, dtype='float64')
+    keep = (rows != -1) & column.notna().to_numpy() & ~np.isnan(values)
+    codes, labels = pd.factorize(column[keep], sort=True)
+    rows = rows[keep]
+    values = values[keep]
+
+    # the long rows grouped by code, each group summed into a column with bincount
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+    out = {}
+    for j, label in enumerate(labels):
+        part = order[bounds[j]:bounds[j + 1]]
+        dense = np.bincount(rows[part], weights=values[part], minlength=len(index)).astype('float32')
+        out[prefix + str(label)] = pd.arrays.SparseArray(dense, fill_value=0)
+    return (pd.DataFrame(out, index=pd.RangeIndex(len(index))))
+
+
+@materialized(lambda a: [ipeds.get_hd(y) for y in ipeds.HD.survey_years(a['fall_years'])] +
+              [ipeds.get_ic(y) for y in ipeds.IC.survey_years(a['fall_years'])] +
+              [ipeds.get_adm(y) for y in ipeds.IC.survey_years(a['fall_years']) if y >= 2014] +
+              [ipeds.get_sfa(y) for y in ipeds.SFA.survey_years(a['fall_years'])] +
+              [ipeds.get_icay(y) for y in ipeds.ICAY.survey_years(a['fall_years'])] +
+              [ipeds.get_efc(y) for y in ipeds.EFC.survey_years(a['fall_years'])] +
+              [ipeds.get_ca(y) for y in ipeds.C_A.survey_years(a['fall_years'])],
+              tables=lambda a: ['region_xwalk'])
+def master(fall_years=[2017],
+           hd_deg4yr=True,
+           hd_service=False,
+           hd_lower48=False,
+           hd_cols=['unitid', 'fall_year', 'instnm', 'fips',
+                    'carnegie', 'sector', 'latitude', 'longitud'],
+           ic_cols=['applcn', 'admssn', 'enrlt', 'admit_rate', 'yield_rate'],
+           sfa_cols=['scfa1n', 'anyaidp', 'igrnt_p', 'igrnt_a'],
+           icay_cols=['chg2ay3', 'chg4ay3', 'chg5ay3', 'chg6ay3'],
+           efc_col='efres02',
+           ca_col='ctotalt',
+           degree_code=None,
+           session=None):
+    """
+    Build a flattened dataset with one row per school and fall.  Columns cip_XX have the completions for
+    each 2 digit CIP family, and columns res_XX the first-time freshmen from each state.  They are sparse,
+    with zeros not stored.  The admissions, aid and charges metrics are joined on as well.
+
+    Parquet has no sparse columns, so the result is only kept in memory, see materialized.  A new session
+    builds it again.
+
+    Parameters:
+        fall_years (list): a list of integers for the Fall years to include.  For example, 2017 is Fall 2017.
+        hd_deg4yr (bool): boolean (default = True) as to filter to only include degree-granting 4-year institutions
+        hd_service (bool): boolean (default = False) which if True, will remove US service schools
+        hd_lower48 (bool): boolean (default = False) which if True, will only keep lower 48 states
+        hd_cols (list): a list of valid column names for the HD survey.  Only these columns will be returned.
+        ic_cols (list): the IC and ADM columns to add, admit_rate and yield_rate are calculated
+        sfa_cols (list): the SFA columns to add
+        icay_cols (list): the IC_AY columns to add
+        efc_col (str): the EF_C column counted for each state of residence
+        ca_col (str): the C_A column summed for each CIP family
+        degree_code (list): only count completions at these award levels, None for all of them
+        session (Session): read the surveys through this registry, see registry.py
+    """
+
+    def hd():
+        i = ipeds.HD(years=fall_years, lazy=True, session=session)
+        i.extract(cols=hd_cols + HD_FILTER_COLS)
+        i.transform(deg4yr=hd_deg4yr)
+        i.transform(service=hd_service)
+        i.transform(lower_us=hd_lower48)
+        i.transform(cols=hd_cols)
+        return (i.load())
+
+    def ic():
+        i = ipeds.IC(years=ipeds.IC.survey_years(fall_years), lazy=True, session=session)
+        i.extract()
+        i.transform(admit_rate=True, yield_rate=True, cols=['unitid', 'fall_year'] + ic_cols)
+        return (i.load())
+
+    def sfa():
+        s = ipeds.SFA(years=ipeds.SFA.survey_years(fall_years), lazy=True, session=session)
+        s.extract()
+        s.transform(cols=['unitid', 'fall_year'] + sfa_cols)
+        return (s.load())
+
+    def icay():
+        c = ipeds.ICAY(years=ipeds.ICAY.survey_years(fall_years), lazy=True, session=session)
+        c.extract()
+        c.transform(cols=['unitid', 'fall_year'] + icay_cols)
+        return (c.load())
+
+    # the residence of first-time freshmen, less the us (58) and grand (99) totals
+    def efc():
+        m = ipeds.EFC(years=ipeds.EFC.survey_years(fall_years), lazy=True, session=session)
+        m.extract()
+        m.transform(cols=['unitid', 'fall_year', 'line', efc_col])
+        df = m.load()
+        return (df.loc[~df.line.isin([58, 99])])
+
+    # completions for the first major
+    def c_a():
+        c = ipeds.C_A(years=ipeds.C_A.survey_years(fall_years), lazy=True, session=session)
+        c.extract()
+        c.transform(cip_label=False, award_level=False, first_major=True, level_keep=degree_code,
+                    cols=['unitid', 'fall_year', 'cipcode', ca_col])
+        df = c.load()
+        return (df.loc[df.cipcode != 99])
+
+    parts = _run_graph({'hd': (hd, []),
+                        'ic': (ic, []),
+                        'sfa': (sfa, []),
+                        'icay': (icay, []),
+                        'efc': (efc, []),
+                        'c_a': (c_a, []),
+                        'regions': (datasets.region_xwalk, [])})
+
+    # one row per school and fall, the metrics joined on
+    df = ipeds.join([parts['hd'], parts['ic'], parts['sfa'], parts['icay']], how='left')
+    index = pd.Index(ipeds._year_key(df.fall_year.to_numpy(dtype='int64'), df.unitid.to_numpy(dtype='int64')))
+
+    # completions by 2 digit cip family
+    comps = parts['c_a']
+    family = np.floor(comps.cipcode).astype('Int64').map(lambda f: '{:02d}'.format(f), na_action='ignore')
+    cips = _sparse_pivot(index,
+                         ipeds._year_key(comps.fall_year.to_numpy(dtype='int64'), comps.unitid.to_numpy(dtype='int64')),
+                         family, comps[ca_col], 'cip_')
+
+    # first-time freshmen by state of residence, named by postal code where the line is a state
+    res = parts['efc']
+    r = parts['regions']
+    states = dict(zip(r['ipeds_code'], r['postal code']))
+    home = res.line.map(lambda l: states.get(l, l), na_action='ignore')
+    residence = _sparse_pivot(index,
+                              ipeds._year_key(res.fall_year.to_numpy(dtype='int64'), res.unitid.to_numpy(dtype='int64')),
+                              home.astype('object'), res[efc_col], 'res_')
+
+    df = pd.concat([df, cips, residence], axis=1)
+
+    # return the data
+    return (df)
+
+
 # ================================================== another view
 # the description
@@ -11,8 +11,12 @@ setup(name='pypeds',
       packages=['pypeds'],
       zip_safe=False,
       include_package_data=True,
+      package_data={'pypeds': ['data/*.csv']},
       install_requires=['pandas',
                         'requests',
                         'altair',
                         'dfply',
-                        'numpy'])
+                        'numpy'],
+      extras_require={'arrow': ['pyarrow'],
+                      'geo': ['scipy'],
+                      'sparse': ['scipy']})
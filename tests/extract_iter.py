@@ -0,0 +1,19 @@
+# test the extract_iter generator
+from pypeds import ipeds
+
+
+############### Test range of years
+
+# the years to teset
+years = list(range(2002, 2019))
+
+# reduce each year as it arrives, only one year is held at a time
+tmp = ipeds.EFC(years=years)
+totals = []
+for df in tmp.extract_iter(cols=['efres02'], where={'line': list(range(1, 99))}):
+    totals.append(df.groupby(['fall_year', 'line'], as_index=False).efres02.sum())
+len(totals)
+
+## cleanup
+del tmp
+del totals
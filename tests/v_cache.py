@@ -0,0 +1,52 @@
+# test the download cache, revalidation and eviction
+import os
+from pypeds import ipeds
+from pypeds import cache
+from pypeds import config
+
+
+
+############### revalidation
+
+hd = ipeds.get_hd(2017)
+path = cache.fetch(hd['url'], hd['survey'])
+digest = cache.digest(hd['survey'])
+assert os.path.exists(path) and digest is not None
+
+# within cache_revalidate the cached zip is used without asking nces
+assert cache.fetch(hd['url'], hd['survey']) == path
+
+# past it, nces is asked and an unchanged zip is kept as is
+checked = [m['checked'] for m in cache.entries() if m['survey'] == hd['survey']][0]
+config.set_option('cache_revalidate', 0)
+assert cache.fetch(hd['url'], hd['survey']) == path
+assert cache.digest(hd['survey']) == digest
+assert [m['checked'] for m in cache.entries() if m['survey'] == hd['survey']][0] >= checked
+config.set_option('cache_revalidate', 24 * 60 * 60)
+
+
+
+############### eviction
+
+ic = ipeds.get_ic(2017)
+cache.fetch(ic['url'], ic['survey'])
+
+# a zip being read is kept, the others go
+with cache.using([hd['survey']]):
+    cache.evict(max_bytes=0)
+    assert cache.digest(hd['survey']) == digest
+    assert cache.digest(ic['survey']) is None
+
+# a zip downloaded in the background is kept until it is read
+cache.prefetch([ic])
+cache.evict(max_bytes=0)
+assert os.path.exists(cache.fetch(ic['url'], ic['survey']))
+
+# and everything goes once nothing is being read
+cache.evict(max_bytes=0)
+assert cache.entries() == []
+
+# by age, the zips not used in the last hour
+cache.fetch(hd['url'], hd['survey'])
+cache.evict(max_age=60 * 60)
+assert cache.digest(hd['survey']) == digest
@@ -0,0 +1,43 @@
+# test that the c and pyarrow engines of read_survey give the same data
+import os
+import tempfile
+import pandas as pd
+from pypeds import ipeds
+
+
+
+############### zero padded codes
+
+# an HD file with the codes IPEDS writes with leading zeros
+folder = tempfile.mkdtemp()
+path = os.path.join(folder, 'hd2017.csv')
+with open(path, 'w') as f:
+    f.write('UNITID,INSTNM,ZIP,OPEID,STABBR,SECTOR,LATITUDE\n')
+    f.write('166027,Harvard University,02138-3800,00215500,MA,2,42.374\n')
+    f.write('100654,Alabama A & M University,35762,00100200,AL,1,34.783\n')
+    f.write('217156,Brown University,02912,00340100,RI,2,.\n')
+
+c = ipeds.read_survey(path, engine='c')
+arrow = ipeds.read_survey(path, engine='pyarrow')
+
+assert list(c.zip) == ['02138-3800', '35762', '02912']
+assert list(c.opeid) == ['00215500', '00100200', '00340100']
+assert list(arrow.zip) == list(c.zip)
+assert list(arrow.opeid) == list(c.opeid)
+assert arrow.stabbr.dtype == 'category' and list(arrow.stabbr) == list(c.stabbr)
+assert str(arrow.sector.dtype) == str(c.sector.dtype) == 'Int8'
+assert arrow.latitude.isna().tolist() == c.latitude.isna().tolist()
+
+
+
+############### a whole survey year
+
+c = ipeds.read_survey(ipeds.zip_parser(**ipeds.get_hd(2017)), engine='c')
+arrow = ipeds.read_survey(ipeds.zip_parser(**ipeds.get_hd(2017)), engine='pyarrow')
+assert list(arrow.columns) == list(c.columns)
+for col in c.columns:
+    assert str(arrow[col].dtype) == str(c[col].dtype), col
+pd.testing.assert_frame_equal(arrow.astype('object'), c.astype('object'), check_dtype=False)
+
+os.remove(path)
+os.rmdir(folder)
@@ -0,0 +1,14 @@
+# test the migration matrix
+from pypeds import flows
+
+
+
+############### one fall
+
+m = flows.matrix(fall_year=2018)
+
+# every question from the same matrix
+x = m.in_state_share()
+x = m.net_flows()
+x = m.top_feeders(k=5)
+x = m.aggregate(rows='division', cols='state')
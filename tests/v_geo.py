@@ -0,0 +1,18 @@
+# test the geo queries
+from pypeds import geo
+
+
+
+############### nearest and within
+
+# the 10 nearest 4-year schools of two institutions
+x = geo.nearest(unitid=[166027, 166683], k=10, year=2017, deg4yr=True)
+
+# everything within 25 miles of boston
+x = geo.within(lat=42.36, lon=-71.06, miles=25, year=2017)
+
+
+
+# every institution at once
+idx = geo.index(2017)
+x = idx.within(unitid=idx.unitid, miles=50)
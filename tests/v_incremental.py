@@ -0,0 +1,92 @@
+# test that extract only reads the survey years it has not read yet
+from pypeds import ipeds
+
+
+def years_read(survey, start):
+    # the survey years parsed since start, from the timings, the steps over every year have no year
+    return (sorted(set(t['year'] for t in survey.timings[start:] if t['year'] is not None)))
+
+
+
+############### add a year
+
+hd = ipeds.HD(years=[2016])
+hd.extract()
+first = len(hd.load())
+
+hd.years = [2016, 2017]
+start = len(hd.timings)
+hd.extract()
+assert years_read(hd, start) == [2017]
+df = hd.load()
+assert sorted(df.survey_year.unique()) == [2016, 2017]
+assert (df.survey_year == 2016).sum() == first
+
+# nothing new, nothing read
+start = len(hd.timings)
+hd.extract()
+assert years_read(hd, start) == []
+
+
+
+############### after a transform that drops columns
+
+# only the columns asked for are shown, the years of the rows are still known
+hd.transform(cols=['unitid', 'instnm'])
+assert list(hd.load().columns) == ['unitid', 'instnm']
+hd.years = [2016, 2017, 2018]
+start = len(hd.timings)
+hd.extract(cols=['instnm'])
+assert years_read(hd, start) == [2018]
+assert sorted(hd.load().survey_year.unique()) == [2016, 2017, 2018]
+
+# the columns the transform dropped are read again when asked for
+start = len(hd.timings)
+hd.extract(cols=['sector'])
+assert years_read(hd, start) == [2016, 2017, 2018]
+df = hd.load()
+assert 'sector' in df.columns and df.sector.notna().any()
+assert (df.survey_year == 2016).sum() == first
+
+
+
+############### after a transform that drops rows
+
+hd = ipeds.HD(years=[2017])
+hd.extract()
+every = len(hd.load())
+hd.transform(service=True)
+hd.transform(cols=['unitid', 'sector'])
+hd.extract()
+assert len(hd.load()) == every
+
+
+
+############### a year read with fewer columns or rows is read again
+
+every = ipeds.HD(years=[2017])
+every.extract()
+hd = ipeds.HD(years=[2017])
+hd.extract(cols=['instnm'])
+hd.extract()
+assert sorted(hd.load().columns) == sorted(every.load().columns)
+
+hd = ipeds.HD(years=[2017])
+hd.extract(where={'sector': 2})
+two = len(hd.load())
+hd.extract(where={'sector': 1})
+df = hd.load()
+assert df.sector.isin([1, 2]).all() and (df.sector == 2).sum() == two
+assert not df.unitid.duplicated().any()
+
+
+
+############### refresh reads every year again
+
+hd = ipeds.HD(years=[2016, 2017])
+hd.extract()
+rows = len(hd.load())
+start = len(hd.timings)
+hd.extract(refresh=True)
+assert years_read(hd, start) == [2016, 2017]
+assert len(hd.load()) == rows
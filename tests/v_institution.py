@@ -0,0 +1,19 @@
+# test the institution lookup
+import pypeds
+from pypeds import ipeds
+
+
+
+############### one institution
+
+# the first call parses the survey years into the store
+x = pypeds.institution(166027, surveys=[ipeds.HD, ipeds.IC, ipeds.SFA], years=[2016, 2017])
+
+# later calls only read the rows of the institution
+x = pypeds.institution(166027, surveys=[ipeds.HD, ipeds.IC, ipeds.SFA], years=[2016, 2017])
+x['HD']
+
+
+
+# a few institutions, every survey
+x = pypeds.institution([166027, 166683], years=[2017])
@@ -0,0 +1,73 @@
+# test that join gives the rows and columns of a chain of merges on unitid and fall_year
+import pandas as pd
+from pypeds import ipeds
+
+
+def merged(frames, how):
+    # what the views did before, a merge per survey, the later columns with a suffix
+    out = frames[0].drop(columns=['survey_year'], errors='ignore')
+    for i, df in enumerate(frames[1:], start=1):
+        df = df.drop(columns=['survey_year'], errors='ignore')
+        out = pd.merge(out, df, on=['unitid', 'fall_year'], how=how, suffixes=('', '_df{}'.format(i)))
+    return (out)
+
+
+def same(out, expected):
+    out = out.reset_index(drop=True)
+    expected = expected.reset_index(drop=True)[list(out.columns)]
+    assert list(out.unitid) == list(expected.unitid) and list(out.fall_year) == list(expected.fall_year)
+    for col in out.columns:
+        assert out[col].astype('float64').fillna(-1).tolist() == expected[col].astype('float64').fillna(-1).tolist(), col
+
+
+
+############### frames
+
+a = pd.DataFrame({'unitid': [300, 100, 200, 100], 'fall_year': [2017, 2017, 2017, 2016], 'x': [1, 2, 3, 4],
+                  'survey_year': 2018})
+b = pd.DataFrame({'unitid': [200, 100, 400], 'fall_year': [2017, 2017, 2017], 'x': [5.0, 6.0, 7.0], 'y': [8, 9, 10]})
+
+# a left join keeps the rows of the first frame in their order
+df = ipeds.join([a, b])
+assert list(df.columns) == ['unitid', 'fall_year', 'x', 'x_df1', 'y']
+assert list(df.unitid) == [300, 100, 200, 100] and list(df.fall_year) == [2017, 2017, 2017, 2016]
+same(df, merged([a, b], 'left'))
+
+# inner and outer are sorted on fall_year then unitid
+for how in ['inner', 'outer']:
+    df = ipeds.join([a, b], how=how)
+    same(df, merged([a, b], how).sort_values(['fall_year', 'unitid']))
+assert list(ipeds.join([a, b], how='inner').unitid) == [100, 200]
+assert len(ipeds.join([a, b], how='outer')) == 5
+
+# large unitids still fit the key, ones that do not are refused
+big = a.assign(unitid=a.unitid + 10 ** 7)
+assert list(ipeds.join([big, b.assign(unitid=b.unitid + 10 ** 7)]).unitid) == list(big.unitid)
+try:
+    ipeds.join([a.assign(unitid=10 ** 9), b])
+    raise AssertionError('a unitid of 10**9 should not fit the key')
+except AssertionError as e:
+    assert 'out of range' in str(e)
+
+# more than one row for an institution and fall
+try:
+    ipeds.join([pd.concat([b, b]), a])
+    raise AssertionError('duplicate keys should be refused')
+except AssertionError as e:
+    assert 'more than one row' in str(e)
+
+
+
+############### surveys
+
+hd = ipeds.HD(years=[2018])
+hd.extract()
+ic = ipeds.IC(years=[2018])
+ic.extract()
+df = ipeds.join([hd, ic])
+assert list(df.unitid) == list(hd.load().unitid)
+expected = pd.merge(hd.load().drop(columns=['survey_year']), ic.load().drop(columns=['survey_year']),
+                    on=['unitid', 'fall_year'], how='left', suffixes=('', '_ic'))
+assert sorted(df.columns) == sorted(expected.columns)
+pd.testing.assert_frame_equal(df[list(expected.columns)].reset_index(drop=True), expected.reset_index(drop=True),
+                              check_dtype=False)
@@ -0,0 +1,68 @@
+# test that the labels added by index lookup match a merge with the lookup tables
+import numpy as np
+import pandas as pd
+from pypeds import ipeds
+from pypeds import datasets
+
+
+def merged(df, table, on):
+    # what the transforms did before, a left merge on the code
+    table = table.loc[table[on].notna()].drop_duplicates(subset=[on], keep='first')
+    return (pd.merge(left=df, right=table, on=on, how='left'))
+
+
+def same(out, expected, on):
+    # the same labels, whatever their dtype
+    for col in expected.columns:
+        assert out[col].astype('object').where(out[col].notna(), None).tolist() == \
+            expected[col].astype('object').where(expected[col].notna(), None).tolist(), col
+
+
+
+############### decode
+
+# small integer codes, missing codes and a code listed twice, the first one wins
+levels = pd.DataFrame({'awlevel': [1, 2, 3, 3], 'label': ['one', 'two', 'three', 'again'], 'years': [0.5, 1.5, 2, 2]})
+df = pd.DataFrame({'awlevel': pd.array([3, 1, 9, None, 3], dtype='Int8'), 'n': range(5)})
+out = ipeds.decode(df.copy(), levels, 'awlevel')
+assert len(out) == len(df)
+assert isinstance(out.label.dtype, pd.CategoricalDtype)
+same(out, merged(df, levels, 'awlevel'), 'awlevel')
+
+# float codes such as cipcode, matched by value
+cips = pd.DataFrame({'cipcode': [1.0101, 11.0701, 52.0201], 'title': ['a', 'b', 'c']})
+df = pd.DataFrame({'cipcode': [52.0201, 99.0, 1.0101, np.nan]})
+same(ipeds.decode(df.copy(), cips, 'cipcode'), merged(df, cips, 'cipcode'), 'cipcode')
+
+# Int8 codes line up with float codes in the table
+df = pd.DataFrame({'awlevel': pd.array([2, 1], dtype='Int8')})
+table = levels.assign(awlevel=levels.awlevel.astype('float64'))
+assert ipeds.decode(df.copy(), table, 'awlevel').label.tolist() == ['two', 'one']
+
+
+
+############### the transforms
+
+ca = ipeds.C_A(years=[2018])
+ca.extract()
+raw = ca.load().copy()
+ca.transform(cip_label=True, award_level=True)
+df = ca.load()
+expected = merged(merged(raw, datasets.cipcodes(), 'cipcode'), datasets.award_levels(), 'awlevel')
+expected = expected.loc[expected.majornum == 1].reset_index(drop=True)
+assert len(df) == len(expected)
+same(df.reset_index(drop=True), expected, 'cipcode')
+
+hd = ipeds.HD(years=[2018])
+hd.extract()
+raw = hd.load().copy()
+hd.transform(regions=True)
+same(hd.load(), merged(raw, ipeds._hd_regions(), 'fips'), 'fips')
+
+efc = ipeds.EFC(years=[2018])
+efc.extract()
+raw = efc.load().copy()
+efc.transform(regions=True)
+df = efc.load()
+same(df, merged(raw, ipeds._efc_regions(), 'line'), 'line')
+assert df.loc[df.line == 25, 'res_zip'].unique().tolist() == ['MA']
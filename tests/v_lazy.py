@@ -0,0 +1,84 @@
+# test that lazy surveys give the same data as eager ones
+import pandas as pd
+from pypeds import ipeds
+
+
+def same(lazy, eager, keys=['unitid']):
+    # the same rows and columns, whatever the order
+    lazy = lazy.sort_values(keys).reset_index(drop=True)
+    eager = eager.sort_values(keys).reset_index(drop=True)[list(lazy.columns)]
+    pd.testing.assert_frame_equal(lazy, eager)
+
+
+def both(survey, extract, transforms, years=[2017]):
+    # run the same calls on a lazy and an eager survey
+    out = []
+    for lazy in [True, False]:
+        s = survey(years=years, lazy=lazy)
+        s.extract(**extract)
+        for t in transforms:
+            s.transform(**t)
+        out.append(s.load())
+    return (out)
+
+
+
+############### reordering: filters on survey columns move ahead of the labels
+
+lazy, eager = both(ipeds.HD, {}, [{'regions': True}, {'deg4yr': True}, {'service': True}])
+same(lazy, eager)
+
+lazy, eager = both(ipeds.C_A, {}, [{'cip_label': True, 'award_level': True, 'level_keep': [5]}],
+                   years=[2018])
+same(lazy, eager, keys=['unitid', 'cipcode', 'majornum', 'awlevel'])
+
+
+
+############### pushdown: only the columns and rows the plan uses are parsed
+
+# a dict filter and a select
+lazy, eager = both(ipeds.HD, {}, [{'deg4yr': True}, {'cols': ['unitid', 'instnm']}])
+same(lazy, eager)
+assert list(lazy.columns) == ['unitid', 'instnm']
+
+# a where function reads columns the select drops
+lazy, eager = both(ipeds.HD, {'where': lambda df: df.sector == 2}, [{'cols': ['unitid', 'instnm']}])
+same(lazy, eager)
+
+# a where dict on the extract, and a mutate
+lazy, eager = both(ipeds.IC, {'where': {'calsys': 1}}, [{'admit_rate': True, 'yield_rate': True,
+                                                         'cols': ['unitid', 'admit_rate']}])
+same(lazy, eager)
+
+
+
+############### a filter is not moved ahead of a select that drops its columns
+
+# the filter fails on the missing columns, lazy or not
+for lazy in [True, False]:
+    hd = ipeds.HD(years=[2017], lazy=lazy)
+    hd.extract()
+    hd.transform(cols=['unitid', 'instnm'])
+    try:
+        hd.transform(deg4yr=True)
+        hd.load()
+        raise AssertionError('a filter on a dropped column should fail')
+    except KeyError:
+        pass
+
+# and so does a filter on columns that were not extracted
+for lazy in [True, False]:
+    hd = ipeds.HD(years=[2017], lazy=lazy)
+    hd.extract(cols=['instnm'])
+    try:
+        hd.transform(deg4yr=True)
+        hd.load()
+        raise AssertionError('a filter on a column that was not extracted should fail')
+    except KeyError:
+        pass
+
+# a filter on a column the select keeps still moves to the front, and is applied while parsing
+where, steps, needs = ipeds._optimize([ipeds._select(['unitid', 'sector']), ipeds._filter({'sector': 2})])
+assert where == {'sector': 2} and [s.kind for s in steps] == ['select']
+where, steps, needs = ipeds._optimize([ipeds._select(['unitid', 'instnm']), ipeds._filter({'sector': 2})])
+assert where == {} and [s.kind for s in steps] == ['select', 'filter']
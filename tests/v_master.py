@@ -0,0 +1,17 @@
+# test the master view
+from pypeds import views
+
+
+
+############### Test range of years
+
+# simple test
+x = views.master(fall_years=[2017])
+
+# the completions and residence columns are sparse
+x.filter(regex='^(cip|res)_').dtypes
+
+
+
+# larger test, bachelor's degrees only
+x = views.master(fall_years=list(range(2014, 2018)), degree_code=[5])
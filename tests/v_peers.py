@@ -0,0 +1,14 @@
+# test the peer engine
+from pypeds import peers
+
+
+
+############### every institution
+
+# simple test
+x = peers.peers(fall_years=[2017], k=10)
+
+
+
+# a few years, charges count twice
+x = peers.peers(fall_years=list(range(2014, 2018)), k=5, weights={'chg2ay3': 2, 'chg4ay3': 2})
@@ -0,0 +1,19 @@
+# test the program mix matrix
+from pypeds import ipeds
+from pypeds import programs
+
+
+
+############### one year of completions
+
+ca = ipeds.C_A(years=[2018])
+ca.extract()
+ca.transform(cip_label=False, award_level=False)
+
+# every program, bachelor's degrees only
+mix = ca.to_sparse_matrix(level=[5])
+mix.matrix.shape
+
+# the CIP families, and the most similar schools
+fam = programs.rollup(mix, cip_digits=2)
+x = programs.most_similar(mix, k=10)
@@ -0,0 +1,50 @@
+# test that extract only keeps the columns and rows asked for
+import pandas as pd
+from pypeds import ipeds
+
+
+hd = ipeds.HD(years=[2017])
+hd.extract()
+every = hd.load()
+
+
+
+############### cols
+
+hd = ipeds.HD(years=[2017])
+hd.extract(cols=['instnm', 'sector'])
+df = hd.load()
+assert sorted(df.columns) == sorted(['unitid', 'instnm', 'sector', 'survey_year', 'fall_year'])
+assert len(df) == len(every)
+
+# a column this survey year does not have is skipped
+hd = ipeds.HD(years=[2017])
+hd.extract(cols=['instnm', 'not_a_column'])
+assert 'not_a_column' not in hd.load().columns
+
+
+
+############### where
+
+# a dict, one value or a list of values
+hd = ipeds.HD(years=[2017])
+hd.extract(where={'sector': [1, 2]})
+df = hd.load()
+assert df.sector.isin([1, 2]).all()
+assert sorted(df.unitid) == sorted(every.unitid[every.sector.isin([1, 2])])
+
+# a function of the parsed dataframe
+hd = ipeds.HD(years=[2017])
+hd.extract(where=lambda df: df.sector == 2)
+df = hd.load()
+assert sorted(df.unitid) == sorted(every.unitid[every.sector == 2])
+
+
+
+############### both
+
+hd = ipeds.HD(years=[2017])
+hd.extract(cols=['instnm', 'sector'], where={'sector': 2})
+df = hd.load()
+expected = every.loc[every.sector == 2, ['unitid', 'instnm']].sort_values('unitid').reset_index(drop=True)
+pd.testing.assert_frame_equal(df[['unitid', 'instnm']].sort_values('unitid').reset_index(drop=True), expected)
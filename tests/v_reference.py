@@ -0,0 +1,78 @@
+# test the lookup tables, memoized, kept as snapshots, and the labels of the shipped snapshots
+import os
+import warnings
+import pandas as pd
+from pypeds import ipeds
+from pypeds import reference
+from pypeds import views
+
+
+
+############### memoized
+
+x = reference.table('award_levels')
+x['changed'] = 1
+assert 'changed' not in reference.table('award_levels').columns
+
+
+
+############### snapshots
+
+# a table that did not change upstream is not written again
+first = reference.download('award_levels')
+assert reference.download('award_levels') == first
+assert reference.snapshots('award_levels')[-1] == first
+reference.refresh(['award_levels'])
+assert not reference.table('award_levels').attrs['bundled']
+
+
+
+############### codes missing from the shipped snapshot
+
+levels = pd.DataFrame({'awlevel': [1, 2, 3], 'label': ['one', 'two', 'three']})
+df = pd.DataFrame({'awlevel': pd.array([1, 3, 5, None], dtype='Int8')})
+
+# a downloaded table gives a missing label
+with warnings.catch_warnings(record=True) as found:
+    warnings.simplefilter('always')
+    out = ipeds.decode(df.copy(), levels, 'awlevel')
+assert len(found) == 0
+assert out.label.isna().tolist() == [False, False, True, True]
+
+# the shipped one warns, since it may only be older
+levels.attrs['bundled'] = True
+with warnings.catch_warnings(record=True) as found:
+    warnings.simplefilter('always')
+    ipeds.decode(df.copy(), levels, 'awlevel')
+assert len(found) == 1 and 'awlevel' in str(found[0].message) and '5' in str(found[0].message)
+
+
+
+############### a view is built again when a table it uses changes
+
+builds = []
+
+@views.materialized(lambda a: [], tables=lambda a: ['award_levels'])
+def first_levels(n=2):
+    builds.append(n)
+    return (reference.table('award_levels').head(n))
+
+views.clear_views()
+first_levels()
+first_levels()
+assert len(builds) == 1
+
+# a newer snapshot with other content
+before = reference.digest('award_levels')
+with open(reference.snapshots('award_levels')[-1]) as f:
+    content = f.read()
+newer = os.path.join(reference.reference_dir(), 'award_levels', '99991231T000000-changed.csv')
+with open(newer, 'w') as f:
+    f.write(content.rstrip('\n') + '\n' + content.rstrip('\n').split('\n')[-1] + '\n')
+reference.clear()
+assert reference.digest('award_levels') != before
+first_levels()
+assert len(builds) == 2
+os.remove(newer)
+reference.clear()
+views.clear_views()
@@ -0,0 +1,53 @@
+# test the column types of the parsed surveys
+import pandas as pd
+from pypeds import ipeds
+from pypeds import schemas
+
+
+
+############### survey families
+
+assert schemas.family('HD2017') == 'HD'
+assert schemas.family('ic2017_ay.csv') == 'ICAY'
+assert schemas.family('IC2017') == 'IC'
+assert schemas.family('EF2017C') == 'EFC'
+assert schemas.family('C2017_A') == 'C_A'
+assert schemas.dtype_of('HD', 'unitid') == 'int32'
+assert schemas.dtype_of('HD', 'xsector') == 'category'
+
+
+
+############### parsed surveys
+
+hd = ipeds.HD(years=[2017])
+hd.extract()
+df = hd.load()
+assert df.unitid.dtype == 'int32'
+assert df.sector.dtype == 'Int8'
+assert df.latitude.dtype == 'float32'
+assert pd.api.types.is_string_dtype(df.instnm)
+
+
+
+# aid totals keep every digit
+sfa = ipeds.SFA(years=[2018])
+sfa.extract()
+df = sfa.load()
+amounts = [c for c in df.columns if c not in ['unitid', 'survey_year', 'fall_year'] and not c.startswith('x')]
+assert all(df[c].dtype == 'float64' for c in amounts)
+
+
+
+# cipcode lines up with datasets.cipcodes()
+ca = ipeds.C_A(years=[2018])
+ca.extract()
+df = ca.load()
+assert df.cipcode.dtype == 'float64'
+assert df.awlevel.dtype == 'Int8'
+assert df.majornum.dtype == 'Int8'
+
+
+
+efc = ipeds.EFC(years=[2018])
+efc.extract()
+assert efc.load().line.dtype == 'Int16'
@@ -0,0 +1,86 @@
+# test that a session parses each survey year once, for every survey object and view, within its memory budget
+import pandas as pd
+import pypeds
+from pypeds import ipeds
+from pypeds import views
+from pypeds import config
+
+
+def hd_key(year):
+    return ((ipeds.get_hd(year)['survey'], year))
+
+
+
+############### one parse per survey year, whatever the survey objects ask for
+
+alone = ipeds.HD(years=[2017])
+alone.extract()
+
+with pypeds.Session() as s:
+    a = ipeds.HD(years=[2017])
+    a.extract(cols=['instnm'])
+    b = ipeds.HD(years=[2017])
+    b.extract(where={'sector': 2})
+    c = ipeds.HD(years=[2017], lazy=True)
+    c.extract()
+    c.transform(cols=['unitid', 'instnm'])
+    c.load()
+    assert s.misses == 1 and s.hits == 2
+    assert list(s.partitions) == [hd_key(2017)]
+
+    # the same rows and columns as without a session
+    pd.testing.assert_frame_equal(a.load(), alone.load()[list(a.load().columns)])
+    expected = alone.load().loc[alone.load().sector == 2].reset_index(drop=True)
+    pd.testing.assert_frame_equal(b.load().reset_index(drop=True), expected)
+
+    # and the copies given out are not the one kept
+    a.load()['instnm'] = 'changed'
+    assert (s.partitions[hd_key(2017)].instnm != 'changed').all()
+
+# leaving the with block drops the survey years
+assert s.nbytes() == 0 and len(s.partitions) == 0
+assert ipeds.HD(years=[2017]).session is None
+
+
+
+############### views in the same session share the survey years
+
+config.set_option('view_cache', False)
+with pypeds.Session() as s:
+    views.migration(years=[2017])
+    misses = s.misses
+    views.program_completions(fall_years=[2017])
+    # HD 2017 was read by migration, only C_A is new
+    assert s.misses == misses + 1
+    assert hd_key(2017) in s.partitions
+config.set_option('view_cache', True)
+
+
+
+############### the least recently used survey years go first
+
+s = pypeds.Session()
+for year in [2016, 2017, 2018]:
+    ipeds.HD(years=[year], session=s).extract()
+sizes = {year: s.sizes[hd_key(year)] for year in [2016, 2017, 2018]}
+
+s = pypeds.Session(max_bytes=sizes[2016] + sizes[2018])
+ipeds.HD(years=[2016], session=s).extract()
+ipeds.HD(years=[2017], session=s).extract()
+# 2016 is used again, so 2017 is now the oldest
+ipeds.HD(years=[2016], session=s).extract()
+ipeds.HD(years=[2018], session=s).extract()
+assert list(s.partitions) == [hd_key(2016), hd_key(2018)]
+assert s.nbytes() <= s.max_bytes
+
+# a year read again after it was dropped is parsed again
+misses = s.misses
+ipeds.HD(years=[2017], session=s).extract()
+assert s.misses == misses + 1
+assert s.nbytes() <= s.max_bytes
+
+# the year just read is kept even when it alone is over the budget
+s = pypeds.Session(max_bytes=0)
+ipeds.HD(years=[2017], session=s).extract()
+ipeds.HD(years=[2018], session=s).extract()
+assert list(s.partitions) == [hd_key(2018)]
@@ -0,0 +1,86 @@
+# test the parquet store of parsed survey years
+import os
+import threading
+import pandas as pd
+from pypeds import ipeds
+from pypeds import cache
+from pypeds import config
+from pypeds import store
+
+
+config.set_option('store', True)
+assert store.enabled(), 'the store needs pyarrow'
+
+
+
+############### round trip
+
+# the first full read of a year parses the csv and fills the store
+hd = ipeds.HD(years=[2017])
+hd.extract()
+parsed = hd.load()
+info = ipeds.get_hd(2017)
+path = store.partition(info['survey'], 2017, cache.digest(info['survey']))
+assert os.path.exists(path)
+
+# the next read comes from the store, with the same columns, values and types
+hd = ipeds.HD(years=[2017])
+hd.extract()
+pd.testing.assert_frame_equal(hd.load(), parsed)
+
+# and the same as a read that does not use it
+config.set_option('store', False)
+hd = ipeds.HD(years=[2017])
+hd.extract()
+pd.testing.assert_frame_equal(hd.load(), parsed)
+config.set_option('store', True)
+
+
+
+############### columns and rows from the store
+
+df = store.read(path, cols=['instnm'], keys=['unitid'], where={'sector': 2})
+expected = parsed.loc[parsed.sector == 2].reset_index(drop=True)
+assert sorted(df.unitid) == sorted(expected.unitid)
+assert sorted(df.columns) == sorted(['unitid', 'instnm', 'sector', 'survey_year', 'fall_year'])
+
+df = store.read(path, where=lambda df: df.sector == 2)
+assert sorted(df.unitid) == sorted(expected.unitid)
+
+# the rows of a few institutions, from the unitid index
+few = parsed.unitid.iloc[:3].tolist()
+df = store.lookup(path, few)
+assert sorted(df.unitid) == sorted(few)
+
+
+
+############### a filtered read of a year not in the store parses only what it asks for
+
+hd = ipeds.HD(years=[2018])
+hd.extract(cols=['instnm'], where={'sector': 2})
+info = ipeds.get_hd(2018)
+assert not os.path.exists(store.partition(info['survey'], 2018, cache.digest(info['survey'])))
+
+
+
+############### writers of the same survey year do not share a temp file
+
+errors = []
+
+
+def rewrite():
+    try:
+        store.write(parsed, path)
+    except Exception as e:
+        errors.append(e)
+
+
+threads = [threading.Thread(target=rewrite) for i in range(8)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+assert errors == []
+pd.testing.assert_frame_equal(store.read(path), store.read(path))
+assert len(store.read(path)) == len(parsed)
+assert [f for f in os.listdir(os.path.dirname(path)) if f.endswith('.tmp')] == []
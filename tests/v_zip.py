@@ -0,0 +1,46 @@
+# test that the survey csv is read straight out of the cached zip, nothing is extracted to disk
+import os
+import glob
+import zipfile
+import tempfile
+import pandas as pd
+from pypeds import ipeds
+
+
+def csv_files():
+    # every csv in the temp folder and the working folder, where extractall used to write
+    return (set(glob.glob(os.path.join(tempfile.gettempdir(), '**', '*.csv'), recursive=True)) |
+            set(glob.glob('*.csv')))
+
+
+
+############### zip_parser points into the zip
+
+before = csv_files()
+info = ipeds.get_hd(2017)
+path = ipeds.zip_parser(url=info['url'], survey=info['survey'])
+assert isinstance(path, ipeds.SurveyFile)
+assert path.survey == info['survey']
+with zipfile.ZipFile(path.zip) as file:
+    assert path.member in file.namelist()
+
+
+
+############### read_survey streams the member
+
+df = ipeds.read_survey(path)
+assert 'unitid' in df.columns and len(df) > 0
+
+# the same rows as the csv inside the zip
+with zipfile.ZipFile(path.zip) as file:
+    with file.open(path.member) as f:
+        raw = pd.read_csv(f, encoding='ISO-8859-1', low_memory=False)
+assert len(df) == len(raw)
+assert sorted(df.unitid) == sorted(raw[[c for c in raw.columns if c.strip().lower() == 'unitid'][0]])
+
+# columns and rows too, each read opens the member again
+df = ipeds.read_survey(path, cols=['instnm'], where={'sector': 2})
+assert len(df) == (raw[[c for c in raw.columns if c.strip().lower() == 'sector'][0]] == 2).sum()
+
+# and no csv was written anywhere
+assert csv_files() == before